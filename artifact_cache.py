@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from importlib.metadata import version
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# Bump whenever the layout or meaning of the stored artifacts changes
+CACHE_VERSION = 3
+
+MANIFEST = 'manifest.json'
+ARRAY_FILES = ['tfidf_data', 'tfidf_indices', 'tfidf_indptr', 'idf',
+               'neighbor_indices', 'neighbor_scores']
+
+# Directory names produced by cache_key; nothing else in cache_dir is ever pruned
+_ENTRY_NAME = re.compile(r'v\d+-[0-9a-f]{32}')
+
+logger = logging.getLogger(__name__)
+
+
+def hash_source(source):
+    """Hash a CSV file's bytes or a DataFrame's contents"""
+    digest = hashlib.sha256()
+    if isinstance(source, pd.DataFrame):
+        digest.update(json.dumps([str(c) for c in source.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(source, index=True).values.tobytes())
+    else:
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(source_hash, config):
+    """Combine a source hash with the feature configuration into a cache key"""
+    config = dict(config, cache_version=CACHE_VERSION,
+                  pandas=pd.__version__, sklearn=version('scikit-learn'))
+    digest = hashlib.sha256(source_hash.encode())
+    digest.update(json.dumps(config, sort_keys=True).encode())
+    return f"v{CACHE_VERSION}-{digest.hexdigest()[:32]}"
+
+
+class ArtifactCache:
+    """Versioned on-disk store of built engine artifacts, one directory per key
+
+    The max_entries most recently used entries are kept, so several catalogs
+    or configurations can share one cache directory.
+    """
+
+    def __init__(self, cache_dir, max_entries=4):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Return the artifacts stored under key, or None if missing or stale
+
+        Arrays are memory-mapped read-only rather than read into memory.
+        """
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, MANIFEST)) as f:
+                manifest = json.load(f)
+            if manifest.get('version') != CACHE_VERSION or manifest.get('key') != key:
+                raise ValueError("stale cache entry")
+
+            arrays = {name: np.load(os.path.join(entry, name + '.npy'), mmap_mode='r')
+                      for name in ARRAY_FILES}
+            with open(os.path.join(entry, 'vocabulary.json')) as f:
+                vocabulary = json.load(f)
+            movies = pd.read_pickle(os.path.join(entry, 'movies.pkl'))
+            # Mark the entry as recently used so pruning keeps it
+            os.utime(os.path.join(entry, MANIFEST))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupt or outdated entry: drop it so it gets rebuilt
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        tfidf_matrix = sp.csr_matrix(
+            (arrays['tfidf_data'], arrays['tfidf_indices'], arrays['tfidf_indptr']),
+            shape=tuple(manifest['tfidf_shape']), copy=False)
+        return {
+            'movies': movies,
+            'vocabulary': vocabulary,
+            'idf': arrays['idf'],
+            'tfidf_matrix': tfidf_matrix,
+            'neighbor_indices': arrays['neighbor_indices'],
+            'neighbor_scores': arrays['neighbor_scores'],
+            'scaler': manifest['scaler'],
+        }
+
+    def save(self, key, artifacts):
+        """Atomically store artifacts under key and prune the least recently used entries
+
+        Returns whether the entry is now stored. Failures are logged rather
+        than raised, since the engine works without its cache.
+        """
+        try:
+            self._write(key, artifacts)
+        except Exception:
+            logger.warning("could not save the artifact cache entry %s", key, exc_info=True)
+            return False
+        self._prune(keep=key)
+        return True
+
+    def _write(self, key, artifacts):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            tfidf_matrix = artifacts['tfidf_matrix'].tocsr()
+            arrays = {
+                'tfidf_data': tfidf_matrix.data,
+                'tfidf_indices': tfidf_matrix.indices,
+                'tfidf_indptr': tfidf_matrix.indptr,
+                'idf': artifacts['idf'],
+                'neighbor_indices': artifacts['neighbor_indices'],
+                'neighbor_scores': artifacts['neighbor_scores'],
+            }
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_dir, name + '.npy'), np.ascontiguousarray(array))
+            with open(os.path.join(tmp_dir, 'vocabulary.json'), 'w') as f:
+                json.dump({term: int(col) for term, col in artifacts['vocabulary'].items()}, f)
+            artifacts['movies'].to_pickle(os.path.join(tmp_dir, 'movies.pkl'))
+
+            # The manifest is written last; an entry without one is incomplete
+            manifest = {
+                'version': CACHE_VERSION,
+                'key': key,
+                'tfidf_shape': list(tfidf_matrix.shape),
+                'scaler': artifacts['scaler'],
+            }
+            with open(os.path.join(tmp_dir, MANIFEST), 'w') as f:
+                json.dump(manifest, f)
+
+            entry = self._entry_dir(key)
+            try:
+                os.replace(tmp_dir, entry)
+            except OSError:
+                # Another process stored the same key first; its entry is just as good
+                if not os.path.exists(os.path.join(entry, MANIFEST)):
+                    raise
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    def _prune(self, keep):
+        """Remove all but the max_entries most recently used entries
+
+        Only directories named like a cache key and holding a manifest are
+        considered, so unrelated files in cache_dir are never touched.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            manifest = os.path.join(self.cache_dir, name, MANIFEST)
+            if name == keep or not _ENTRY_NAME.fullmatch(name):
+                continue
+            try:
+                entries.append((os.path.getmtime(manifest), name))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        for _, name in entries[max(0, self.max_entries - 1):]:
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
@@ -0,0 +1,192 @@
+"""Benchmarks for the recommendation engine on synthetic catalogs
+
+    python benchmark.py --sizes 1000 10000 100000 --output bench.json
+
+Each size runs in a fresh process so peak memory is measured per catalog;
+the synthetic CSV is generated beforehand in a process of its own, so the
+generator's memory is not counted.
+Results are written as JSON; pass --baseline with an earlier file to print
+the relative change of every metric.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+GENRES = ['Action', 'Animation', 'Comedy', 'Drama', 'Fantasy', 'Romance', 'Horror', 'Thriller',
+          'Documentary', 'Sci-Fi']
+STUDIOS = ['20th Century Fox', 'CBS', 'Disney', 'Fox', 'Independent', 'Lionsgate', 'New Line',
+           'Paramount', 'Sony', 'Summit', 'The Weinstein Company', 'Universal', 'Warner Bros.']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ven', 'tor', 'el', 'sa', 'dun', 'qui', 'ber', 'nox',
+             'pha', 'zel', 'ti', 'mor', 'gan', 'o', 'lys', 'dra']
+MODES = ['content', 'feature', 'hybrid']
+
+
+def generate_catalog(n_rows, seed=0, vocabulary_size=5000):
+    """A random catalog in the movies.csv schema, identical for the same seed"""
+    rng = np.random.default_rng(seed)
+
+    # Titles are 1-4 words drawn from a made-up vocabulary with a long-tailed frequency
+    words = np.array([''.join(rng.choice(SYLLABLES, size=rng.integers(2, 4))).capitalize()
+                      for _ in range(vocabulary_size)])
+    word_weights = 1 / np.arange(1, vocabulary_size + 1)
+    word_weights /= word_weights.sum()
+    title_lengths = rng.integers(1, 5, size=n_rows)
+    title_words = rng.choice(words, size=(n_rows, 4), p=word_weights)
+    films = [' '.join(row[:length]) for row, length in zip(title_words, title_lengths)]
+
+    gross = rng.lognormal(mean=4, sigma=1.2, size=n_rows)
+    return pd.DataFrame({
+        'Film': films,
+        'Genre': rng.choice(GENRES, size=n_rows),
+        'Lead Studio': rng.choice(STUDIOS, size=n_rows),
+        'Audience score %': rng.integers(10, 100, size=n_rows),
+        'Profitability': np.round(rng.lognormal(mean=0.5, sigma=1.0, size=n_rows), 6),
+        'Rotten Tomatoes %': rng.integers(0, 100, size=n_rows),
+        'Worldwide Gross': [f"${value:,.2f} " for value in gross],
+        'Year': rng.integers(1950, 2025, size=n_rows),
+    })
+
+
+def write_catalog(path, n_rows, seed=0):
+    generate_catalog(n_rows, seed).to_csv(path, index=False)
+    return path
+
+
+def run_size(csv_path, n_rows, seed=0, queries=200, top_n=10, n_jobs=1):
+    """Measure one catalog written by write_catalog; meant to run in its own process"""
+    from engine import RecommendationEngine
+
+    csv_bytes = os.path.getsize(csv_path)
+
+    # Load from the path as the server does, so the catalog is held once
+    engine = RecommendationEngine(csv_path, result_cache_size=0, n_jobs=n_jobs)
+    load_s, build_s = engine.timings['load'], engine.timings['build']
+
+    rng = np.random.default_rng(seed + 1)
+    titles = engine.movies['Film'].to_numpy()[rng.integers(0, len(engine.movies), size=queries)]
+    preferences = [{
+        'Genre': rng.choice(GENRES) if rng.random() < 0.5 else None,
+        'Studio': rng.choice(STUDIOS) if rng.random() < 0.3 else None,
+        'Min Audience Score': int(rng.integers(0, 80)),
+        'Min Critic Score': int(rng.integers(0, 80)),
+    } for _ in range(queries)]
+    calls = {
+        'content': lambda i: engine.recommend_content(titles[i], top_n),
+        'feature': lambda i: engine.recommend_features(preferences[i], top_n),
+        'hybrid': lambda i: engine.recommend_hybrid(titles[i], preferences[i], top_n),
+    }
+
+    latency = {}
+    for mode in MODES:
+        timings = np.empty(queries)
+        for i in range(queries):
+            start = time.perf_counter()
+            calls[mode](i)
+            timings[i] = time.perf_counter() - start
+        timings *= 1000
+        latency[mode] = {
+            'p50_ms': float(np.percentile(timings, 50)),
+            'p99_ms': float(np.percentile(timings, 99)),
+            'mean_ms': float(timings.mean()),
+        }
+
+    return {
+        'rows': n_rows,
+        'csv_bytes': csv_bytes,
+        'load_s': load_s,
+        'build_s': build_s,
+        'peak_rss_mb': _peak_rss_mb(),
+        'latency': latency,
+    }
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
+
+
+def compare(results, baseline):
+    """Relative change of each metric against a baseline run, keyed by catalog size"""
+    previous = {entry['rows']: entry for entry in baseline['results']}
+    changes = {}
+    for entry in results['results']:
+        old = previous.get(entry['rows'])
+        if old is None:
+            continue
+        metrics = {name: (entry[name], old[name]) for name in ('load_s', 'build_s', 'peak_rss_mb')}
+        for mode in MODES:
+            for stat in ('p50_ms', 'p99_ms'):
+                metrics[f'{mode}.{stat}'] = (entry['latency'][mode][stat], old['latency'][mode][stat])
+        changes[entry['rows']] = {name: (new - old_value) / old_value
+                                  for name, (new, old_value) in metrics.items()
+                                  if new is not None and old_value}
+    return changes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation engine")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--queries', type=int, default=200, help="queries per mode for latency")
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--jobs', type=int, default=1, help="processes for the model build")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'queries': args.queries,
+        'top_n': args.top_n,
+        'jobs': args.jobs,
+        'results': [],
+    }
+    context = multiprocessing.get_context('spawn')
+    for n_rows in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'movies.csv')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                pool.submit(write_catalog, csv_path, n_rows, args.seed).result()
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                entry = pool.submit(run_size, csv_path, n_rows, args.seed, args.queries, args.top_n,
+                                    args.jobs).result()
+        results['results'].append(entry)
+        latency = entry['latency']
+        print(f"{n_rows:>9} rows  load {entry['load_s']:.2f}s  build {entry['build_s']:.2f}s  "
+              f"peak {entry['peak_rss_mb'] or 0:.0f} MB  p50/p99 ms: "
+              + '  '.join(f"{mode} {latency[mode]['p50_ms']:.2f}/{latency[mode]['p99_ms']:.2f}"
+                          for mode in MODES), flush=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        for n_rows, changes in compare(results, baseline).items():
+            print(f"{n_rows:>9} rows vs baseline: "
+                  + '  '.join(f"{name} {change:+.1%}" for name, change in changes.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+import copy
+import weakref
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+
+from artifact_cache import ArtifactCache, cache_key, hash_source
+from filter_index import FilterIndex, top_positions
+from loader import DEFAULT_CHUNKSIZE, clean_catalog, concat_catalogs, feature_documents, load_catalog
+from metrics import REGISTRY
+from neighbors import NeighborIndex
+from result_cache import ResultCache
+from title_index import TitleIndex
+
+DISPLAY_COLUMNS = ['Film', 'Genre', 'Lead Studio', 'Year', 'Audience score %', 'Rotten Tomatoes %']
+NUMERICAL_FEATURES = ['Audience score %', 'Rotten Tomatoes %', 'Worldwide Gross', 'Profitability']
+_EMPTY_ROWS = np.empty(0, dtype=np.int64)
+
+
+class RecommendationEngine:
+    """Headless movie recommendation engine, usable without any GUI"""
+
+    def __init__(self, source, n_neighbors=50, cache_dir=None, chunksize=DEFAULT_CHUNKSIZE,
+                 hybrid_weights=(0.7, 0.3), result_cache_size=1024, n_jobs=1):
+        """Build the engine from a CSV path or an already loaded DataFrame
+
+        With a cache_dir, built artifacts are stored on disk keyed by the data
+        and configuration, and later runs memory-map them instead of rebuilding.
+        n_jobs worker processes (-1 for every CPU) share the neighbour build.
+        """
+        self.n_neighbors = n_neighbors
+        self.n_jobs = n_jobs
+        self.chunksize = chunksize
+        self.hybrid_weights = hybrid_weights
+        self.result_cache = ResultCache(result_cache_size)
+        REGISTRY.add_collector('result_cache', _result_cache_gauges(weakref.ref(self.result_cache)))
+        REGISTRY.add_collector('catalog', _catalog_gauges(weakref.ref(self)))
+        self.timings = {}
+        self._tfidf = self._scaler = None
+        self.cache = ArtifactCache(cache_dir) if cache_dir else None
+
+        if self.cache:
+            with REGISTRY.timer('cache_lookup') as stopwatch:
+                key = cache_key(hash_source(source), self._config())
+                artifacts = self.cache.load(key)
+                if artifacts is not None:
+                    self._restore_artifacts(artifacts)
+            if artifacts is not None:
+                self.timings['cache_load'] = stopwatch.elapsed
+                return
+
+        with REGISTRY.timer('catalog_load') as stopwatch:
+            if isinstance(source, pd.DataFrame):
+                self.movies = clean_catalog(source.copy())
+            else:
+                self.movies = load_catalog(source, chunksize)
+        self.timings['load'] = stopwatch.elapsed
+
+        with REGISTRY.timer('model_build') as stopwatch:
+            self._build_models()
+        self.timings['build'] = stopwatch.elapsed
+
+        if self.cache:
+            with REGISTRY.timer('cache_save') as stopwatch:
+                self.cache.save(key, self._artifacts())
+            self.timings['cache_save'] = stopwatch.elapsed
+
+    def _config(self):
+        """Settings that change the built models, used in the cache key"""
+        return {
+            'n_neighbors': self.n_neighbors,
+            'stop_words': 'english',
+            'numerical_features': NUMERICAL_FEATURES,
+        }
+
+    def _build_models(self):
+        """Build recommendation models"""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.preprocessing import MinMaxScaler
+
+        with REGISTRY.timer('build_tfidf'):
+            self._tfidf = TfidfVectorizer(stop_words='english')
+            self.tfidf_matrix = self._tfidf.fit_transform(feature_documents(self.movies, self.chunksize))
+        with REGISTRY.timer('build_neighbors'):
+            self.content_neighbors = NeighborIndex.build(self.tfidf_matrix, k=self.n_neighbors,
+                                                         n_jobs=self.n_jobs)
+
+        with REGISTRY.timer('build_scaler'):
+            self.fill_values = self.movies[NUMERICAL_FEATURES].median()
+            self._scaler = MinMaxScaler()
+            self.movies[NUMERICAL_FEATURES] = self._scaler.fit_transform(
+                self.movies[NUMERICAL_FEATURES].fillna(self.fill_values)).astype(np.float32)
+
+        self._build_indexes()
+
+    @REGISTRY.timed('build_indexes')
+    def _build_indexes(self):
+        """Build the title lookup and the feature filter index over the current catalog"""
+        self.filter_index = FilterIndex(self.movies)
+        self.result_cache.clear()
+
+        # First occurrence wins for duplicated titles, as with a boolean-mask lookup
+        films = self.movies['Film']
+        self._first_occurrence = ~films.duplicated().to_numpy()
+        first_rows = np.flatnonzero(self._first_occurrence)
+        self.title_index = TitleIndex(films.to_numpy()[first_rows], first_rows)
+        self._record_sizes()
+
+    @REGISTRY.timed('update_indexes')
+    def _add_to_indexes(self, start, rescaled):
+        """Index the rows appended from start on, updating the indexes in place"""
+        films = self.movies['Film'].to_numpy()[start:]
+        added = self.title_index.add(films, np.arange(start, len(self.movies)))
+        self._first_occurrence = np.concatenate([self._first_occurrence, added])
+        self.filter_index.add_rows(self.movies, start)
+        if rescaled:
+            self.filter_index.refresh_scores(self.movies)
+        self.result_cache.clear()
+        self._record_sizes()
+
+    @REGISTRY.timed('update_indexes')
+    def _remove_from_indexes(self, keep, titles, rescaled):
+        """Drop the rows where keep is False from the indexes, renumbering the rest"""
+        new_ids = np.cumsum(keep) - 1
+        new_ids[~keep] = -1
+        self.title_index.remove(titles, new_ids)
+        self._first_occurrence = self._first_occurrence[keep]
+        self.filter_index.remove_rows(keep, new_ids)
+        if rescaled:
+            self.filter_index.refresh_scores(self.movies)
+        self.result_cache.clear()
+        self._record_sizes()
+
+    def _record_sizes(self):
+        """Publish the size of the catalog and the built structures as gauges"""
+        matrix, neighbors = self.tfidf_matrix, self.content_neighbors
+        REGISTRY.gauge('catalog_rows', len(self.movies))
+        REGISTRY.gauge('tfidf_terms', matrix.shape[1])
+        REGISTRY.gauge('tfidf_matrix_bytes', matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes)
+        REGISTRY.gauge('neighbor_index_bytes', neighbors.indices.nbytes + neighbors.scores.nbytes)
+
+    def _artifacts(self):
+        """Collect the built state for the artifact cache"""
+        return {
+            'movies': self.movies,
+            'vocabulary': self.tfidf.vocabulary_,
+            'idf': self.tfidf.idf_,
+            'tfidf_matrix': self.tfidf_matrix,
+            'neighbor_indices': self.content_neighbors.indices,
+            'neighbor_scores': self.content_neighbors.scores,
+            'scaler': {
+                'data_min': self.scaler.data_min_.tolist(),
+                'data_max': self.scaler.data_max_.tolist(),
+                'n_samples_seen': int(self.scaler.n_samples_seen_),
+                'fill_values': self.fill_values.tolist(),
+            },
+        }
+
+    def _restore_artifacts(self, artifacts):
+        """Rebuild the engine state from cached artifacts without refitting"""
+        self.movies = artifacts['movies']
+
+        # sklearn objects are only recreated if add/remove needs them
+        self._tfidf = self._scaler = None
+        self._vectorizer_state = (artifacts['vocabulary'], artifacts['idf'])
+        self._scaler_state = artifacts['scaler']
+        self.tfidf_matrix = artifacts['tfidf_matrix']
+        self.content_neighbors = NeighborIndex(artifacts['neighbor_indices'], artifacts['neighbor_scores'])
+
+        self.fill_values = pd.Series(artifacts['scaler']['fill_values'], index=NUMERICAL_FEATURES)
+
+        self._build_indexes()
+
+    @property
+    def tfidf(self):
+        """The fitted TfidfVectorizer, recreated on first use after a cache restore"""
+        if self._tfidf is None:
+            vocabulary, idf = self._vectorizer_state
+            self._tfidf = _fitted_vectorizer(vocabulary, np.asarray(idf))
+        return self._tfidf
+
+    @property
+    def scaler(self):
+        """The fitted MinMaxScaler, recreated on first use after a cache restore"""
+        if self._scaler is None:
+            from sklearn.preprocessing import MinMaxScaler
+
+            # Recreate the fitted scaler from its stored range, as MinMaxScaler.fit would
+            params = self._scaler_state
+            self._scaler = MinMaxScaler()
+            self._scaler.partial_fit(pd.DataFrame([params['data_min'], params['data_max']],
+                                                  columns=NUMERICAL_FEATURES))
+            self._scaler.n_samples_seen_ = params['n_samples_seen']
+        return self._scaler
+
+    @REGISTRY.timed('add_movies')
+    def add_movies(self, new_movies):
+        """Add new movies without refitting the models
+
+        Rows are vectorized with the existing TF-IDF weights; terms never seen
+        before get new columns, so stored vectors stay valid. Returns the row
+        ids assigned to the new movies. The new state is built aside and only
+        swapped in at the end, so an add that fails leaves the engine as it was.
+        """
+        new_movies = pd.DataFrame(new_movies)
+        if new_movies.empty:
+            return np.empty(0, dtype=np.int64)
+        new_movies = clean_catalog(new_movies.copy())
+        n_old = len(self.movies)
+
+        # Widen the scaler range if needed; existing rows only move when it changes
+        raw = new_movies[NUMERICAL_FEATURES].fillna(self.fill_values)
+        scaler = copy.deepcopy(self.scaler)
+        old_min, old_max = scaler.data_min_.copy(), scaler.data_max_.copy()
+        scaler.partial_fit(raw)
+        rescaled = n_old > 0 and not (np.array_equal(old_min, scaler.data_min_)
+                                      and np.array_equal(old_max, scaler.data_max_))
+        new_movies[NUMERICAL_FEATURES] = scaler.transform(raw).astype(np.float32)
+        old_movies = self.movies
+        if rescaled:
+            old_movies = old_movies.copy()
+            old_movies[NUMERICAL_FEATURES] = _rescaled(scaler, old_movies[NUMERICAL_FEATURES], old_min, old_max)
+        movies = concat_catalogs([old_movies, new_movies])
+
+        documents = list(feature_documents(new_movies))
+        tfidf = self._extended_vectorizer(documents, len(movies))
+        new_matrix = tfidf.transform(documents)
+        old_matrix = self.tfidf_matrix
+        old_matrix = sp.csr_matrix((old_matrix.data, old_matrix.indices, old_matrix.indptr),
+                                   shape=(old_matrix.shape[0], new_matrix.shape[1]))
+        tfidf_matrix = sp.vstack([old_matrix, new_matrix], format='csr')
+        neighbors = NeighborIndex(self.content_neighbors.indices, self.content_neighbors.scores)
+        neighbors.add_rows(tfidf_matrix, k=self.n_neighbors)
+
+        self._tfidf, self._scaler = tfidf, scaler
+        self.tfidf_matrix, self.content_neighbors, self.movies = tfidf_matrix, neighbors, movies
+        self._add_to_indexes(n_old, rescaled)
+        return np.arange(n_old, len(self.movies))
+
+    @REGISTRY.timed('remove_movies')
+    def remove_movies(self, titles):
+        """Remove every movie with one of the given titles, returning how many were dropped
+
+        As with add_movies, the engine is left unchanged if the removal fails.
+        """
+        keep = ~self.movies['Film'].isin(list(titles)).to_numpy()
+        n_removed = int((~keep).sum())
+        if not n_removed:
+            return 0
+
+        tfidf_matrix = self.tfidf_matrix[np.flatnonzero(keep)]
+        neighbors = NeighborIndex(self.content_neighbors.indices, self.content_neighbors.scores)
+        neighbors.remove_rows(tfidf_matrix, keep, k=self.n_neighbors)
+
+        # The range only shrinks if a removed movie sat on one of its ends
+        removed = self.movies.loc[~keep, NUMERICAL_FEATURES].to_numpy()
+        removed_titles = self.movies['Film'].to_numpy()[~keep]
+        movies = self.movies[keep].reset_index(drop=True)
+        scaler = self.scaler
+        rescaled = bool(len(movies)) and (np.isclose(removed, 0) | np.isclose(removed, 1)).any()
+        if rescaled:
+            old_min, old_max = scaler.data_min_.copy(), scaler.data_max_.copy()
+            raw = movies[NUMERICAL_FEATURES] * (old_max - old_min) + old_min
+            scaler = copy.deepcopy(scaler)
+            scaler.fit(raw)
+            scaler.n_samples_seen_ = self.scaler.n_samples_seen_
+            movies[NUMERICAL_FEATURES] = _rescaled(scaler, movies[NUMERICAL_FEATURES], old_min, old_max)
+
+        self._scaler = scaler
+        self.tfidf_matrix, self.content_neighbors, self.movies = tfidf_matrix, neighbors, movies
+        self._remove_from_indexes(keep, set(removed_titles), rescaled)
+        return n_removed
+
+    def _extended_vectorizer(self, documents, n_documents):
+        """The vectorizer with columns appended for unseen terms, keeping existing term weights fixed"""
+        analyzer = self.tfidf.build_analyzer()
+        vocabulary = dict(self.tfidf.vocabulary_)
+        new_terms = {}
+        for document in documents:
+            for term in set(analyzer(document)):
+                if term not in vocabulary:
+                    new_terms[term] = new_terms.get(term, 0) + 1
+        if not new_terms:
+            return self.tfidf
+
+        # Smoothed idf, matching TfidfVectorizer's formula for the current catalog size
+        for term in new_terms:
+            vocabulary[term] = len(vocabulary)
+        df = np.fromiter(new_terms.values(), dtype=np.float64, count=len(new_terms))
+        new_idf = np.log((1 + n_documents) / (1 + df)) + 1
+        return _fitted_vectorizer(vocabulary, np.concatenate([np.asarray(self.tfidf.idf_), new_idf]))
+
+    def title_rows(self, titles):
+        """Map titles to row ids, with -1 for unknown titles"""
+        rows = (self.title_index.row(title) for title in titles)
+        return np.fromiter((-1 if row is None else row for row in rows), dtype=np.int64, count=len(titles))
+
+    def suggest_titles(self, text, limit=10):
+        """Typeahead suggestions for partially typed or misspelled titles"""
+        return self.title_index.search(text, limit)
+
+    @REGISTRY.timed('recommend_content_many', profile=True)
+    def recommend_content_many(self, titles, k=5):
+        """Top-k similar movies for many seed titles in one vectorized lookup
+
+        Returns (indices, scores) arrays of shape (len(titles), k). Each title
+        is offered once, so a list can come up short; the gaps, and the rows
+        for unknown titles, are filled with -1 and NaN.
+        """
+        rows = self.title_rows(titles)
+        k = min(k, self.content_neighbors.k)
+        known = rows >= 0
+
+        indices = np.full((len(rows), k), -1, dtype=np.int32)
+        scores = np.full((len(rows), k), np.nan, dtype=np.float32)
+        indices[known], scores[known] = self._unique_neighbors(rows[known], k)
+        return indices, scores
+
+    def _unique_neighbors(self, rows, k):
+        """Neighbour lists of rows without repeated titles, best first, padded with -1 and NaN
+
+        The whole stored list is read, so k movies remain after duplicates
+        (including copies of the seed's own title) are dropped where possible.
+        """
+        candidates = self.content_neighbors.indices[rows]
+        keep = self._first_occurrence[candidates]
+        # A stable sort moves the kept neighbours to the front in their original order
+        order = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+        indices = np.take_along_axis(candidates, order, axis=1)
+        scores = np.take_along_axis(self.content_neighbors.scores[rows], order, axis=1)
+        padding = np.arange(indices.shape[1]) >= keep.sum(axis=1, keepdims=True)
+        indices[padding] = -1
+        scores[padding] = np.nan
+        return indices, scores
+
+    @REGISTRY.timed('recommend_content', profile=True)
+    def recommend_content(self, movie_title, top_n=5):
+        """Get content-based recommendations"""
+        # Keyed on the resolved row, so spellings of one title share an entry
+        row = self.title_index.row(movie_title)
+        return self._cached(('content', row, top_n), lambda: self._recommend_content(row, top_n))
+
+    def _recommend_content(self, row, top_n):
+        if row is None:
+            return pd.DataFrame()
+        movie_indices = self._unique_neighbors(np.array([row]), top_n)[0][0]
+        return self._result_frame(movie_indices[movie_indices >= 0])
+
+    @REGISTRY.timed('recommend_features', profile=True)
+    def recommend_features(self, preferences, top_n=5):
+        """Get feature-based recommendations"""
+        preferences = normalize_preferences(preferences)
+        return self._cached(('feature', _preferences_key(preferences), top_n),
+                            lambda: self._recommend_features(preferences, top_n))
+
+    def _recommend_features(self, preferences, top_n):
+        with REGISTRY.timer('feature_filter'):
+            rows = self.filter_index.top_n(preferences, top_n)
+        return self._result_frame(rows)
+
+    @REGISTRY.timed('recommend_hybrid', profile=True)
+    def recommend_hybrid(self, movie_title, preferences, top_n=5, weights=None):
+        """Get hybrid recommendations
+
+        Every movie passing the filters is scored in one pass as a weighted
+        blend of its content similarity to the seed and its Recommendation
+        Score, using weights (content, feature) or the engine's hybrid_weights.
+        """
+        preferences = normalize_preferences(preferences)
+        weights = tuple(weights or self.hybrid_weights)
+        seed = self.title_index.row(movie_title)
+        return self._cached(('hybrid', seed, _preferences_key(preferences), weights, top_n),
+                            lambda: self._recommend_hybrid(seed, preferences, top_n, weights))
+
+    def _recommend_hybrid(self, seed, preferences, top_n, weights):
+        if seed is None:
+            rows, _ = self._hybrid_rank(_EMPTY_ROWS, preferences, top_n, weights, None)
+        else:
+            profile = self.tfidf_matrix[seed].T
+            rows, _ = self._hybrid_rank(np.array([seed]), preferences, top_n, weights,
+                                        lambda candidates: self._content_scores(profile, candidates))
+        return self._result_frame(rows)
+
+    @REGISTRY.timed('recommend_content_session', profile=True)
+    def recommend_content_session(self, titles, top_n=5, seed_weights=None):
+        """Content-based recommendations for a set of seed titles, e.g. a watchlist
+
+        Candidates are scored by their weighted mean similarity to the seeds,
+        read from the seeds' stored neighbour lists in one vectorized pass; a
+        movie outside a seed's list counts as 0 for that seed. The seeds
+        themselves are never recommended, and unknown titles are ignored.
+        """
+        seeds, seed_weights = self._session_seeds(titles, seed_weights)
+        return self._cached(('content_session', tuple(seeds), tuple(seed_weights), top_n),
+                            lambda: self._recommend_content_session(seeds, seed_weights, top_n))
+
+    def _recommend_content_session(self, seeds, seed_weights, top_n):
+        rows, _ = self._content_session_rank(seeds, seed_weights, top_n)
+        return self._result_frame(rows)
+
+    @REGISTRY.timed('content_session_rank')
+    def _content_session_rank(self, seeds, seed_weights, top_n):
+        """Best rows by weighted mean neighbour score over the seeds, with their scores"""
+        if not seeds.size:
+            return _EMPTY_ROWS, np.empty(0)
+        candidates = self.content_neighbors.indices[seeds].ravel()
+        weighted = (self.content_neighbors.scores[seeds] * seed_weights[:, None]).ravel()
+        rows, inverse = np.unique(candidates, return_inverse=True)
+        scores = np.bincount(inverse, weights=weighted, minlength=rows.size) / (seed_weights.sum() or 1)
+
+        # Each title is offered once, and never one of the seeds
+        keep = self._first_occurrence[rows] & ~np.isin(rows, seeds)
+        rows, scores = rows[keep], scores[keep]
+        best = top_positions(rows, scores, top_n)
+        return rows[best], scores[best]
+
+    @REGISTRY.timed('recommend_hybrid_session', profile=True)
+    def recommend_hybrid_session(self, titles, preferences, top_n=5, seed_weights=None, weights=None):
+        """Hybrid recommendations for a set of seed titles, e.g. a watchlist
+
+        The seeds' TF-IDF rows are averaged with seed_weights into one profile
+        vector, so content similarity costs a single sparse product however
+        many seeds there are: the blend uses each movie's weighted mean cosine
+        similarity to the seeds. Seeds are never recommended.
+        """
+        preferences = normalize_preferences(preferences)
+        weights = tuple(weights or self.hybrid_weights)
+        seeds, seed_weights = self._session_seeds(titles, seed_weights)
+        key = ('hybrid_session', tuple(seeds), tuple(seed_weights), _preferences_key(preferences), weights, top_n)
+        return self._cached(key, lambda: self._recommend_hybrid_session(
+            seeds, seed_weights, preferences, top_n, weights))
+
+    def _recommend_hybrid_session(self, seeds, seed_weights, preferences, top_n, weights):
+        content_scores = None
+        if seeds.size:
+            profile = self._session_profile(seeds, seed_weights)
+            content_scores = lambda candidates: self._content_scores(profile, candidates)
+        rows, _ = self._hybrid_rank(seeds, preferences, top_n, weights, content_scores)
+        return self._result_frame(rows)
+
+    def _session_seeds(self, titles, seed_weights=None):
+        """Known seed rows (sorted, each once) and their summed weights"""
+        rows = self.title_rows(titles)
+        seed_weights = np.ones(len(rows)) if seed_weights is None else check_seed_weights(seed_weights)
+        if seed_weights.shape != rows.shape:
+            raise ValueError(f"expected {len(rows)} seed weights, got {seed_weights.size}")
+        known = rows >= 0
+        seeds, inverse = np.unique(rows[known], return_inverse=True)
+        return seeds, np.bincount(inverse, weights=seed_weights[known], minlength=seeds.size)
+
+    def _session_profile(self, seeds, seed_weights):
+        """Weighted mean of the seeds' TF-IDF rows as a sparse column vector"""
+        mix = sp.csr_matrix((seed_weights / (seed_weights.sum() or 1), (np.zeros_like(seeds), seeds)),
+                            shape=(1, self.tfidf_matrix.shape[0]))
+        return (mix @ self.tfidf_matrix).T
+
+    @REGISTRY.timed('recommend_hybrid_many', profile=True)
+    def recommend_hybrid_many(self, titles, preferences, top_n=5, weights=None):
+        """Hybrid rankings for many seeds with one batched similarity product
+
+        preferences is either one dict applied to every seed or a list with one
+        dict per seed. Returns a list of (rows, scores) arrays, best first.
+        """
+        if isinstance(preferences, dict):
+            preferences = [preferences] * len(titles)
+        preferences = [normalize_preferences(p) for p in preferences]
+        weights = tuple(weights or self.hybrid_weights)
+
+        seeds = self.title_rows(titles)
+        known = np.flatnonzero(seeds >= 0)
+        similarity = np.zeros((len(self.movies), len(titles)), dtype=np.float32)
+        if known.size and weights[0]:
+            with REGISTRY.timer('hybrid_similarity'):
+                similarity[:, known] = (self.tfidf_matrix @ self.tfidf_matrix[seeds[known]].T).toarray()
+
+        results = []
+        for i, (seed, query) in enumerate(zip(seeds, preferences)):
+            if seed < 0:
+                results.append(self._hybrid_rank(_EMPTY_ROWS, query, top_n, weights, None))
+            else:
+                results.append(self._hybrid_rank(seeds[i:i + 1], query, top_n, weights,
+                                                 lambda candidates, i=i: similarity[candidates, i]))
+        return results
+
+    @REGISTRY.timed('hybrid_rank')
+    def _hybrid_rank(self, seen, preferences, top_n, weights, content_scores):
+        """Blend content similarity and Recommendation Score over the filtered movies
+
+        seen holds the seed rows, which are never recommended; content_scores
+        maps candidate rows to their similarity, or is None without a seed.
+        """
+        content_weight, feature_weight = weights
+        rows = self.filter_index.candidates(preferences)
+        if rows is None:
+            rows = np.arange(len(self.movies))
+
+        # Each title is offered once, and never a seed
+        rows = rows[self._first_occurrence[rows] & np.isin(rows, seen, invert=True)]
+        scores = feature_weight * self.filter_index.scores[rows]
+        if content_scores is not None and content_weight:
+            scores = scores + content_weight * content_scores(rows)
+
+        best = top_positions(rows, scores, top_n)
+        return rows[best], scores[best]
+
+    @REGISTRY.timed('result_frame')
+    def _result_frame(self, rows):
+        """Display columns of the ranked rows, or an empty frame when nothing matched"""
+        if not len(rows):
+            return pd.DataFrame()
+        return self.movies.iloc[rows][DISPLAY_COLUMNS]
+
+    def _cached(self, key, compute):
+        """Serve a result from the result cache; callers get their own copy"""
+        return self.result_cache.get_or_compute(key, compute).copy()
+
+    def _content_scores(self, profile, rows):
+        """Similarity of each of rows to a TF-IDF profile (a sparse column vector)"""
+        if rows.size == len(self.movies):
+            similarity = self.tfidf_matrix @ profile
+        else:
+            similarity = self.tfidf_matrix[rows] @ profile
+        return similarity.toarray().ravel()
+
+
+def normalize_preferences(preferences):
+    """Canonical form of a filter query: empty filters dropped, thresholds in whole percent"""
+    return {
+        'Genre': preferences.get('Genre') or None,
+        'Studio': preferences.get('Studio') or None,
+        'Min Audience Score': round(preferences.get('Min Audience Score') or 0),
+        'Min Critic Score': round(preferences.get('Min Critic Score') or 0),
+    }
+
+
+def check_seed_weights(seed_weights):
+    """Per-seed weights as a float array; raises ValueError unless they are finite and non-negative"""
+    seed_weights = np.asarray(seed_weights, dtype=np.float64)
+    if seed_weights.ndim != 1:
+        raise ValueError("seed weights must be a flat sequence of numbers")
+    if not np.isfinite(seed_weights).all() or (seed_weights < 0).any():
+        raise ValueError("seed weights must be finite and non-negative")
+    if seed_weights.size and not seed_weights.any():
+        raise ValueError("at least one seed weight must be positive")
+    return seed_weights
+
+
+def _result_cache_gauges(cache_ref):
+    """Collector for the result cache statistics that does not keep the cache alive"""
+    def collect():
+        cache = cache_ref()
+        if cache is None:
+            return {}
+        return {f'result_cache_{name}': value for name, value in cache.stats().items()}
+    return collect
+
+
+def _rescaled(scaler, scaled, old_min, old_max):
+    """Scaled columns from the range old_min..old_max re-expressed in the scaler's current range"""
+    raw = scaled * (old_max - old_min) + old_min
+    return scaler.transform(raw).astype(np.float32)
+
+
+def _catalog_gauges(engine_ref):
+    """Collector for the catalog memory, measured only when a snapshot is taken
+
+    A deep memory count walks every string in the catalog, too slow to repeat
+    on each add_movies/remove_movies.
+    """
+    def collect():
+        engine = engine_ref()
+        if engine is None or getattr(engine, 'movies', None) is None:
+            return {}
+        return {'catalog_bytes': int(engine.movies.memory_usage(deep=True).sum())}
+    return collect
+
+
+def _preferences_key(preferences):
+    return (preferences['Genre'], preferences['Studio'],
+            preferences['Min Audience Score'], preferences['Min Critic Score'])
+
+
+def _fitted_vectorizer(vocabulary, idf):
+    """Recreate a fitted TfidfVectorizer from its vocabulary and idf weights"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    tfidf = TfidfVectorizer(stop_words='english')
+    tfidf.vocabulary_ = vocabulary
+    tfidf.idf_ = idf
+    return tfidf
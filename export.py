@@ -0,0 +1,309 @@
+"""Offline export of precomputed recommendations for the whole catalog
+
+    python export.py movies.csv --output recommendations.npz -k 20
+    python export.py movies.csv --output recommendations.parquet --buckets --top-n 10
+
+The main file holds the content neighbours of every movie: movie_id, title,
+neighbor_ids (k per movie, best first) and neighbor_scores. Rows are written
+in chunks, so memory stays bounded by the chunk size rather than the catalog.
+NPZ output needs only numpy; a .parquet output needs pyarrow and stores the
+neighbour columns as fixed-size lists.
+
+With --buckets two more files are written next to the output:
+
+    <name>.feature.<ext>  top movies by Recommendation Score for every Genre,
+                          every Studio and every Genre + Studio pair
+    <name>.hybrid.<ext>   hybrid recommendations for every title within its
+                          own Genre and within its own Studio
+
+Bucket rows carry genre and studio columns, with '' meaning "any". Lists
+shorter than the requested length are padded with -1 ids and NaN scores.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from engine import RecommendationEngine
+
+BUCKET_COLUMNS = {'genre': ('Genre', 'Genre'), 'studio': ('Studio', 'Lead Studio')}
+
+
+def export_neighbors(engine, path, k=None, chunk_rows=50_000):
+    """Write the top-k content neighbours of every movie; returns the number of rows"""
+    neighbors = engine.content_neighbors
+    k = neighbors.k if k is None else min(k, neighbors.k)
+    titles = _text_column(engine.movies['Film'])
+    columns = [('movie_id', np.int32, 0), ('title', _text_dtype(titles), 0),
+               ('neighbor_ids', np.int32, k), ('neighbor_scores', np.float32, k)]
+
+    with open_writer(path, columns, len(titles)) as writer:
+        for start in range(0, len(titles), chunk_rows):
+            stop = min(start + chunk_rows, len(titles))
+            writer.write({
+                'movie_id': np.arange(start, stop, dtype=np.int32),
+                'title': titles[start:stop],
+                'neighbor_ids': neighbors.indices[start:stop, :k],
+                'neighbor_scores': neighbors.scores[start:stop, :k],
+            })
+    return len(titles)
+
+
+def export_feature_rankings(engine, path, top_n=20, buckets=('genre', 'studio')):
+    """Write the feature-based ranking of every Genre/Studio bucket; returns the number of rows"""
+    keys = _bucket_keys(engine, buckets)
+    genres = np.array([genre for genre, _ in keys], dtype=_text_dtype([genre for genre, _ in keys]))
+    studios = np.array([studio for _, studio in keys], dtype=_text_dtype([studio for _, studio in keys]))
+    columns = [('genre', genres.dtype, 0), ('studio', studios.dtype, 0),
+               ('movie_ids', np.int32, top_n), ('scores', np.float32, top_n)]
+
+    movie_ids = np.full((len(keys), top_n), -1, dtype=np.int32)
+    scores = np.full((len(keys), top_n), np.nan, dtype=np.float32)
+    for i, (genre, studio) in enumerate(keys):
+        rows = engine.filter_index.top_n({'Genre': genre or None, 'Studio': studio or None}, top_n)
+        movie_ids[i, :rows.size] = rows
+        scores[i, :rows.size] = engine.filter_index.scores[rows]
+
+    with open_writer(path, columns, len(keys)) as writer:
+        writer.write({'genre': genres, 'studio': studios, 'movie_ids': movie_ids, 'scores': scores})
+    return len(keys)
+
+
+def export_hybrid_rankings(engine, path, top_n=20, buckets=('genre', 'studio'), weights=None,
+                           block_elements=2**24):
+    """Write hybrid recommendations for every title within each of its own buckets
+
+    Seeds are ranked in chunks through recommend_hybrid_many, sized so the
+    dense similarity slab stays within block_elements. Returns the number of rows.
+    """
+    seeds = engine.title_index.rows
+    titles = np.asarray(engine.title_index.titles, dtype=str)
+    values = {kind: _text_column(engine.movies[BUCKET_COLUMNS[kind][1]])[seeds] for kind in buckets}
+    empty = np.full(len(seeds), '')
+    genres, studios = values.get('genre', empty), values.get('studio', empty)
+    columns = [('movie_id', np.int32, 0), ('title', _text_dtype(titles), 0),
+               ('genre', _text_dtype(genres), 0), ('studio', _text_dtype(studios), 0),
+               ('movie_ids', np.int32, top_n), ('scores', np.float32, top_n)]
+
+    n_buckets = len(buckets)
+    chunk = max(1, block_elements // (len(engine.movies) * n_buckets))
+    with open_writer(path, columns, len(seeds) * n_buckets) as writer:
+        for start in range(0, len(seeds), chunk):
+            stop = min(start + chunk, len(seeds))
+            # One query per (seed, bucket), ordered seed by seed
+            positions = np.repeat(np.arange(start, stop), n_buckets)
+            kinds = np.tile(np.array(buckets), stop - start)
+            preferences = [{BUCKET_COLUMNS[kind][0]: values[kind][position]}
+                           for position, kind in zip(positions, kinds)]
+            results = engine.recommend_hybrid_many(list(titles[positions]), preferences, top_n, weights)
+
+            movie_ids = np.full((len(results), top_n), -1, dtype=np.int32)
+            scores = np.full((len(results), top_n), np.nan, dtype=np.float32)
+            for i, (rows, row_scores) in enumerate(results):
+                movie_ids[i, :rows.size] = rows
+                scores[i, :rows.size] = row_scores
+            writer.write({
+                'movie_id': seeds[positions].astype(np.int32),
+                'title': titles[positions],
+                'genre': np.where(kinds == 'genre', genres[positions], ''),
+                'studio': np.where(kinds == 'studio', studios[positions], ''),
+                'movie_ids': movie_ids,
+                'scores': scores,
+            })
+    return len(seeds) * n_buckets
+
+
+def open_writer(path, columns, n_rows, format=None):
+    """Columnar writer for path, chosen by format ('npz' or 'parquet') or the file suffix
+
+    columns lists (name, dtype, width) with width 0 for scalar columns and
+    the list length otherwise; n_rows is the total the writer will receive.
+    """
+    if format is None:
+        format = 'parquet' if path.lower().endswith(('.parquet', '.pq')) else 'npz'
+    if format == 'parquet':
+        return ParquetWriter(path, columns)
+    if format == 'npz':
+        return NpzWriter(path, columns, n_rows)
+    raise ValueError(f"unknown export format {format!r}")
+
+
+class NpzWriter:
+    """Write an .npz file in row chunks without holding the columns in memory
+
+    Each column is filled through a memory-mapped .npy file in a temporary
+    directory next to path; closing copies them into the archive and moves
+    it into place, so a failed export never leaves a partial file behind.
+    """
+
+    def __init__(self, path, columns, n_rows):
+        self.path = path
+        self._tmp_dir = tempfile.mkdtemp(prefix='.export-', dir=os.path.dirname(os.path.abspath(path)))
+        self._arrays = {
+            name: np.lib.format.open_memmap(os.path.join(self._tmp_dir, f'{name}.npy'), mode='w+',
+                                            dtype=dtype, shape=(n_rows, width) if width else (n_rows,))
+            for name, dtype, width in columns
+        }
+        self._row = 0
+
+    def write(self, batch):
+        n = len(next(iter(batch.values())))
+        for name, values in batch.items():
+            self._arrays[name][self._row:self._row + n] = values
+        self._row += n
+
+    def close(self):
+        try:
+            names = list(self._arrays)
+            for array in self._arrays.values():
+                array.flush()
+            # Release the maps before the files are read back or removed
+            self._arrays.clear()
+
+            archive = os.path.join(self._tmp_dir, 'export.npz')
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+                for name in names:
+                    zf.write(os.path.join(self._tmp_dir, f'{name}.npy'), f'{name}.npy')
+            os.replace(archive, self.path)
+        finally:
+            self.discard()
+
+    def discard(self):
+        self._arrays.clear()
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class ParquetWriter:
+    """Write a Parquet file with one row group per chunk; list columns use fixed-size lists"""
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export needs pyarrow; install it or write a .npz file instead")
+
+        self._pa = pa
+        self.path = path
+        self._widths = {name: width for name, _, width in columns}
+        fields = []
+        for name, dtype, width in columns:
+            dtype = np.dtype(dtype)
+            value_type = pa.string() if dtype.kind == 'U' else pa.from_numpy_dtype(dtype)
+            fields.append(pa.field(name, pa.list_(value_type, width) if width else value_type))
+        self._schema = pa.schema(fields)
+        self._tmp_path = os.path.join(os.path.dirname(os.path.abspath(path)),
+                                      f'.export-{os.getpid()}-{os.path.basename(path)}')
+        self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+
+    def write(self, batch):
+        pa = self._pa
+        arrays = []
+        for field in self._schema:
+            values = np.asarray(batch[field.name])
+            width = self._widths[field.name]
+            if width:
+                arrays.append(pa.FixedSizeListArray.from_arrays(pa.array(values.ravel()), width))
+            elif values.dtype.kind == 'U':
+                arrays.append(pa.array(values.tolist(), type=pa.string()))
+            else:
+                arrays.append(pa.array(values))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def discard(self):
+        self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def bucket_path(path, name):
+    """Path of a bucket file next to the main export, e.g. out.npz -> out.feature.npz"""
+    stem, ext = os.path.splitext(path)
+    return f'{stem}.{name}{ext}'
+
+
+def _bucket_keys(engine, buckets):
+    """(genre, studio) pairs to rank, with '' for a bucket dimension that is not filtered"""
+    columns = [BUCKET_COLUMNS[kind][1] for kind in buckets]
+    frame = engine.movies[columns].dropna().astype(str)
+    keys = set()
+    for kind, column in zip(buckets, columns):
+        for value in frame[column].unique():
+            keys.add((value, '') if kind == 'genre' else ('', value))
+    if len(columns) == 2:
+        keys.update(map(tuple, frame.drop_duplicates().itertuples(index=False)))
+    return sorted(keys)
+
+
+def _text_column(column):
+    """Column values as strings, with '' for missing values"""
+    return column.astype(object).where(column.notna(), '').astype(str).to_numpy()
+
+
+def _text_dtype(values):
+    """Fixed-width unicode dtype wide enough for every value"""
+    return np.dtype(f'U{max((len(value) for value in values), default=0) or 1}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export precomputed recommendations for every movie")
+    parser.add_argument('csv_path', nargs='?', default='movies.csv')
+    parser.add_argument('--output', default='recommendations.npz', help=".npz or .parquet file")
+    parser.add_argument('-k', type=int, default=None, help="neighbours per movie (default: all stored)")
+    parser.add_argument('--buckets', action='store_true',
+                        help="also export feature and hybrid rankings per Genre/Studio bucket")
+    parser.add_argument('--bucket-by', nargs='+', choices=list(BUCKET_COLUMNS), default=list(BUCKET_COLUMNS))
+    parser.add_argument('--top-n', type=int, default=20, help="length of each bucket ranking")
+    parser.add_argument('--chunk-rows', type=int, default=50_000)
+    parser.add_argument('--cache-dir', default=None, help="artifact cache directory")
+    parser.add_argument('--jobs', type=int, default=1, help="processes for the model build")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    engine = RecommendationEngine(args.csv_path, cache_dir=args.cache_dir, n_jobs=args.jobs,
+                                  result_cache_size=0)
+    print(f"Loaded {len(engine.movies)} movies in {time.perf_counter() - start:.2f}s", flush=True)
+
+    exports = [(args.output, lambda path: export_neighbors(engine, path, args.k, args.chunk_rows))]
+    if args.buckets:
+        bucket_by = tuple(args.bucket_by)
+        exports += [
+            (bucket_path(args.output, 'feature'),
+             lambda path: export_feature_rankings(engine, path, args.top_n, bucket_by)),
+            (bucket_path(args.output, 'hybrid'),
+             lambda path: export_hybrid_rankings(engine, path, args.top_n, bucket_by)),
+        ]
+    for path, export in exports:
+        start = time.perf_counter()
+        n_rows = export(path)
+        print(f"Wrote {n_rows} rows to {path} in {time.perf_counter() - start:.2f}s", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+AUDIENCE_WEIGHT = 0.6
+CRITIC_WEIGHT = 0.4
+
+
+class FilterIndex:
+    """Row-id lookups for the feature-based filters, built once per catalog
+
+    Genre and studio map to code arrays plus the sorted row ids of each value,
+    the two score columns are kept sorted for range lookups, and the weighted
+    Recommendation Score is precomputed for every row.
+    """
+
+    def __init__(self, movies):
+        self.genre_codes, self.genre_lookup, self.genre_rows = _value_index(movies['Genre'])
+        self.studio_codes, self.studio_lookup, self.studio_rows = _value_index(movies['Lead Studio'])
+        self.refresh_scores(movies)
+
+    def refresh_scores(self, movies):
+        """Re-read the score columns, e.g. after the scaler range changed
+
+        Scores stay float32 like the catalog columns, so thresholds and the
+        weighted score compare exactly as a filter on the frame would.
+        """
+        self.audience = movies['Audience score %'].to_numpy(dtype=np.float32)
+        self.critic = movies['Rotten Tomatoes %'].to_numpy(dtype=np.float32)
+        self.audience_order = np.argsort(self.audience, kind='stable')
+        self.critic_order = np.argsort(self.critic, kind='stable')
+        self.audience_sorted = self.audience[self.audience_order]
+        self.critic_sorted = self.critic[self.critic_order]
+        self.scores = self.audience * AUDIENCE_WEIGHT + self.critic * CRITIC_WEIGHT
+
+    def add_rows(self, movies, start):
+        """Index the rows of movies from start on, appended since the index was built
+
+        New rows are merged into the per-value row lists and the sorted score
+        columns, so the cost follows the number of new rows plus a copy of
+        each array rather than a full re-sort.
+        """
+        new = movies.iloc[start:]
+        rows = np.arange(start, len(movies))
+        self.genre_codes = _extend_value_index(self.genre_codes, self.genre_lookup, self.genre_rows,
+                                               new['Genre'], rows)
+        self.studio_codes = _extend_value_index(self.studio_codes, self.studio_lookup, self.studio_rows,
+                                                new['Lead Studio'], rows)
+
+        audience = new['Audience score %'].to_numpy(dtype=np.float32)
+        critic = new['Rotten Tomatoes %'].to_numpy(dtype=np.float32)
+        self.audience_order, self.audience_sorted = _insert_sorted(
+            self.audience_order, self.audience_sorted, audience, rows)
+        self.critic_order, self.critic_sorted = _insert_sorted(
+            self.critic_order, self.critic_sorted, critic, rows)
+        self.audience = np.concatenate([self.audience, audience])
+        self.critic = np.concatenate([self.critic, critic])
+        self.scores = np.concatenate([self.scores, audience * AUDIENCE_WEIGHT + critic * CRITIC_WEIGHT])
+
+    def remove_rows(self, keep, new_ids):
+        """Drop the rows where keep is False, renumbering the rest with new_ids (old row -> new row)"""
+        self.genre_codes = self.genre_codes[keep]
+        self.studio_codes = self.studio_codes[keep]
+        self.genre_rows = [new_ids[rows[keep[rows]]] for rows in self.genre_rows]
+        self.studio_rows = [new_ids[rows[keep[rows]]] for rows in self.studio_rows]
+
+        audience_kept = keep[self.audience_order]
+        critic_kept = keep[self.critic_order]
+        self.audience_order = new_ids[self.audience_order[audience_kept]]
+        self.critic_order = new_ids[self.critic_order[critic_kept]]
+        self.audience_sorted = self.audience_sorted[audience_kept]
+        self.critic_sorted = self.critic_sorted[critic_kept]
+        self.audience = self.audience[keep]
+        self.critic = self.critic[keep]
+        self.scores = self.scores[keep]
+
+    def __len__(self):
+        return len(self.scores)
+
+    def candidates(self, preferences):
+        """Row ids matching every filter in preferences, or None when nothing is filtered"""
+        sets = []
+        if preferences.get('Genre'):
+            code = self.genre_lookup.get(preferences['Genre'], -1)
+            rows = self.genre_rows[code] if code >= 0 else _EMPTY
+            sets.append((rows, lambda r, c=code: self.genre_codes[r] == c))
+        if preferences.get('Studio'):
+            code = self.studio_lookup.get(preferences['Studio'], -1)
+            rows = self.studio_rows[code] if code >= 0 else _EMPTY
+            sets.append((rows, lambda r, c=code: self.studio_codes[r] == c))
+        if preferences.get('Min Audience Score'):
+            threshold = np.float32(preferences['Min Audience Score']/100)
+            start = np.searchsorted(self.audience_sorted, threshold, side='left')
+            sets.append((self.audience_order[start:], lambda r, t=threshold: self.audience[r] >= t))
+        if preferences.get('Min Critic Score'):
+            threshold = np.float32(preferences['Min Critic Score']/100)
+            start = np.searchsorted(self.critic_sorted, threshold, side='left')
+            sets.append((self.critic_order[start:], lambda r, t=threshold: self.critic[r] >= t))
+
+        if not sets:
+            return None
+
+        # Start from the most selective set and check the others row by row
+        sets.sort(key=lambda s: len(s[0]))
+        rows = sets[0][0]
+        for _, matches in sets[1:]:
+            if not rows.size:
+                break
+            rows = rows[matches(rows)]
+        return rows
+
+    def top_n(self, preferences, top_n=5):
+        """Best matching row ids by Recommendation Score, highest first"""
+        rows = self.candidates(preferences)
+        if rows is None:
+            rows = np.arange(len(self))
+        return top_rows(rows, self.scores[rows], top_n)
+
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def top_rows(rows, scores, top_n):
+    """The top_n rows by score, highest first with ties going to the lower row id"""
+    return rows[top_positions(rows, scores, top_n)]
+
+
+def top_positions(rows, scores, top_n):
+    """Positions in rows of the top_n scores, ordered as in top_rows"""
+    if top_n <= 0 or not rows.size:
+        return _EMPTY
+    positions = np.arange(rows.size)
+    if rows.size > top_n:
+        # Keep every row tied with the top_n-th score so the lower row ids win the tie
+        # (written as "not below" so NaN scores stay in when too few rows have a score)
+        kth = -np.partition(-scores, top_n - 1)[top_n - 1]
+        positions = np.flatnonzero(~(scores < kth))
+    return positions[np.lexsort((rows[positions], -scores[positions]))][:top_n]
+
+
+def _extend_value_index(codes, lookup, rows_by_code, column, rows):
+    """Add new rows to a value index from _value_index in place; returns the extended codes"""
+    new_codes, uniques = pd.factorize(column)
+    mapped = np.full(len(new_codes), -1, dtype=codes.dtype)
+    for i, value in enumerate(uniques):
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(rows_by_code)
+            rows_by_code.append(_EMPTY)
+        matches = new_codes == i
+        mapped[matches] = code
+        # New row ids are all larger than the existing ones, so the list stays sorted
+        rows_by_code[code] = np.concatenate([rows_by_code[code], rows[matches]])
+    return np.concatenate([codes, mapped])
+
+
+def _insert_sorted(order, sorted_values, values, rows):
+    """Merge new rows into a stable value ordering; ties keep row order as a stable argsort would"""
+    new_order = np.argsort(values, kind='stable')
+    positions = np.searchsorted(sorted_values, values[new_order], side='right')
+    return (np.insert(order, positions, rows[new_order]),
+            np.insert(sorted_values, positions, values[new_order]))
+
+
+def _value_index(column):
+    """Integer codes for a column, a value-to-code map and the sorted row ids per code"""
+    codes, uniques = pd.factorize(column)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    lookup = {value: code for code, value in enumerate(uniques)}
+    rows = [order[bounds[code]:bounds[code + 1]] for code in range(len(uniques))]
+    return codes, lookup, rows
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from metrics import REGISTRY
+
+DEFAULT_CHUNKSIZE = 50_000
+
+CATEGORICAL_COLUMNS = ['Genre', 'Lead Studio']
+FLOAT_COLUMNS = ['Audience score %', 'Rotten Tomatoes %', 'Profitability', 'Worldwide Gross']
+
+# Read everything that needs cleaning as text; the rest is typed by the parser
+READ_DTYPES = {
+    'Film': str,
+    'Genre': 'category',
+    'Lead Studio': 'category',
+    'Audience score %': np.float32,
+    'Rotten Tomatoes %': np.float32,
+    'Profitability': np.float32,
+    'Worldwide Gross': str,
+}
+
+# Characters stripped from Worldwide Gross values such as "$41.94 " or "$1,024.00"
+_GROSS_JUNK = str.maketrans('', '', '$, ')
+
+
+@REGISTRY.timed('load_catalog')
+def load_catalog(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream a movies CSV in chunks into a compact, cleaned DataFrame
+
+    Only one raw chunk is held at a time; cleaned chunks keep categorical
+    Genre/Lead Studio and float32 numeric columns.
+    """
+    chunks = []
+    for chunk in pd.read_csv(file_path, dtype=READ_DTYPES, chunksize=chunksize):
+        chunks.append(clean_catalog(chunk))
+        REGISTRY.count('catalog_chunks_read')
+    movies = concat_catalogs(chunks)
+    REGISTRY.count('catalog_rows_loaded', len(movies))
+    return movies
+
+
+@REGISTRY.timed('clean_catalog')
+def clean_catalog(movies):
+    """Clean raw movie rows into the compact catalog schema"""
+    movies = movies.reset_index(drop=True)
+
+    # Clean data
+    for column in CATEGORICAL_COLUMNS:
+        if not isinstance(movies[column].dtype, pd.CategoricalDtype):
+            movies[column] = movies[column].astype('category')
+        # An all-missing column gets empty object/float categories, which
+        # union_categoricals will not merge with string ones
+        categories = movies[column].cat.categories
+        movies[column] = movies[column].cat.rename_categories(categories.astype(str))
+    if not pd.api.types.is_numeric_dtype(movies['Worldwide Gross']):
+        movies['Worldwide Gross'] = pd.to_numeric(
+            movies['Worldwide Gross'].str.translate(_GROSS_JUNK), errors='coerce')
+    for column in FLOAT_COLUMNS:
+        movies[column] = movies[column].astype(np.float32)
+    movies['Profitability'] = movies['Profitability'].replace(0, np.nan)
+
+    # Clean Year column
+    if pd.api.types.is_datetime64_any_dtype(movies['Year']):
+        movies['Year'] = movies['Year'].dt.year
+    elif not pd.api.types.is_numeric_dtype(movies['Year']):
+        movies['Year'] = pd.to_numeric(movies['Year'].str.extract(r'(\d{4})', expand=False), errors='coerce')
+    if movies['Year'].notna().all():
+        movies['Year'] = movies['Year'].astype(np.int16)
+    else:
+        movies['Year'] = movies['Year'].astype(np.float32)
+
+    return movies
+
+
+def concat_catalogs(frames):
+    """Concatenate cleaned catalogs, merging categories instead of falling back to object"""
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    categoricals = {column: union_categoricals([frame[column] for frame in frames])
+                    for column in CATEGORICAL_COLUMNS}
+    movies = pd.concat([frame.drop(columns=CATEGORICAL_COLUMNS) for frame in frames], ignore_index=True)
+    for column, values in categoricals.items():
+        movies[column] = values
+    if movies['Year'].notna().all():
+        movies['Year'] = movies['Year'].astype(np.int16)
+    return movies[frames[0].columns]
+
+
+def feature_documents(movies, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield the combined text features of each movie without storing them as a column"""
+    for start in range(0, len(movies), chunksize):
+        chunk = movies.iloc[start:start + chunksize]
+        yield from (
+            chunk['Film'].astype(str) + ' ' +
+            chunk['Genre'].astype(str) + ' ' +
+            chunk['Lead Studio'].astype(object).fillna('').astype(str) + ' ' +
+            chunk['Year'].astype(str)
+        )
@@ -0,0 +1,210 @@
+"""Stage timers, counters and memory gauges shared by the engine, server and GUI
+
+Code records into the process-wide REGISTRY, directly or with the
+REGISTRY.timed(stage) decorator:
+
+    with REGISTRY.timer('build_tfidf'):
+        ...
+    REGISTRY.count('catalog_rows_loaded', len(frame))
+    REGISTRY.gauge('tfidf_matrix_bytes', matrix.data.nbytes)
+
+and a snapshot can be exported as Prometheus text (to_prometheus) or
+appended to a JSON-lines log (write_json_log). Setting a profile directory
+makes every REGISTRY.profile(name) block run under cProfile and save its
+stats there, e.g. profile-recommend_hybrid-20240101T120000-1.prof.
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PREFIX = 'moviemagic'
+_NAME = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class Stopwatch:
+    """Elapsed time of a timer block, available once the block has finished"""
+
+    def __init__(self):
+        self.elapsed = None
+
+
+class Metrics:
+    """Thread-safe registry of stage timers, counters and gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = {}
+        self.profile_dir = None
+        self._profiled = 0
+        self._profile_lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the enclosed block as one call of stage; yields a Stopwatch"""
+        stopwatch = Stopwatch()
+        start = time.perf_counter()
+        try:
+            yield stopwatch
+        finally:
+            stopwatch.elapsed = time.perf_counter() - start
+            self.observe(stage, stopwatch.elapsed)
+
+    def timed(self, stage, profile=False):
+        """Decorator timing every call as stage; with profile, calls also run under self.profile(stage)"""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    if not profile:
+                        return fn(*args, **kwargs)
+                    with self.profile(stage):
+                        return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, stage, seconds):
+        """Record one call of stage that took seconds"""
+        with self._lock:
+            timer = self._timers.get(stage)
+            if timer is None:
+                self._timers[stage] = [1, seconds, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                timer[2] = max(timer[2], seconds)
+                timer[3] = seconds
+
+    def count(self, name, n=1):
+        """Add n to a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """Set a gauge to its current value"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def add_collector(self, name, collect):
+        """Call collect() at every snapshot for extra gauges; a later collector replaces one of the same name"""
+        with self._lock:
+            self._collectors[name] = collect
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self):
+        """Current values as plain dicts: timers (count, total, max and last seconds), counters, gauges"""
+        with self._lock:
+            timers = {stage: {'count': count, 'total_s': total, 'max_s': longest, 'last_s': last}
+                      for stage, (count, total, longest, last) in self._timers.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            collectors = list(self._collectors.values())
+        for collect in collectors:
+            gauges.update(collect())
+        gauges.update(_process_memory())
+        return {'timers': timers, 'counters': counters, 'gauges': gauges}
+
+    def to_prometheus(self, prefix=PREFIX):
+        """Snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        stage = f'{prefix}_stage_seconds'
+        lines = [f'# HELP {stage} Time spent per stage', f'# TYPE {stage} summary']
+        for name, timer in sorted(snapshot['timers'].items()):
+            lines.append(f'{stage}_count{{stage="{name}"}} {timer["count"]}')
+            lines.append(f'{stage}_sum{{stage="{name}"}} {timer["total_s"]:.9g}')
+        lines.append(f'# TYPE {stage}_max gauge')
+        for name, timer in sorted(snapshot['timers'].items()):
+            lines.append(f'{stage}_max{{stage="{name}"}} {timer["max_s"]:.9g}')
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f'{prefix}_{_NAME.sub("_", name)}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = f'{prefix}_{_NAME.sub("_", name)}'
+            lines += [f'# TYPE {metric} gauge', f'{metric} {value}']
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self):
+        """Snapshot as one line of JSON with a UTC timestamp"""
+        return json.dumps({'timestamp': datetime.now(timezone.utc).isoformat(), **self.snapshot()})
+
+    def write_json_log(self, path):
+        """Append the current snapshot to a JSON-lines log"""
+        with open(path, 'a') as f:
+            f.write(self.to_json() + '\n')
+
+    def write(self, path):
+        """Write a Prometheus snapshot (.prom or .txt) or append to a JSON log (anything else)"""
+        if path.endswith(('.prom', '.txt')):
+            with open(path, 'w') as f:
+                f.write(self.to_prometheus())
+        else:
+            self.write_json_log(path)
+
+    @contextmanager
+    def profile(self, name):
+        """Run the block under cProfile when a profile directory is set, saving the stats there
+
+        Only one block is profiled at a time in the whole process (Python 3.12+
+        allows a single active profiler); blocks that start while another one
+        is being profiled, on any thread or nested, simply run unprofiled.
+        """
+        if self.profile_dir is None or not self._profile_lock.acquire(blocking=False):
+            yield
+            return
+
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Some other profiling tool is active
+            self._profile_lock.release()
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._profile_lock.release()
+            with self._lock:
+                self._profiled += 1
+                number = self._profiled
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+            profiler.dump_stats(os.path.join(self.profile_dir, f'profile-{name}-{stamp}-{number}.prof'))
+
+
+def _process_memory():
+    """Resident and peak memory of this process in bytes, where the platform reports them"""
+    gauges = {}
+    try:
+        with open('/proc/self/statm') as f:
+            gauges['process_resident_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        gauges['process_peak_resident_bytes'] = peak if os.uname().sysname == 'Darwin' else peak * 1024
+    return gauges
+
+
+REGISTRY = Metrics()
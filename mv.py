@@ -1,19 +1,44 @@
-import pandas as pd
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
+import time
+_START = time.perf_counter()
+
+# Only the GUI toolkit is imported up front; pandas/sklearn load with the engine on a
+# worker thread, and matplotlib/seaborn/PIL on the first chart
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
 import io
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+from functools import partial
+
+from metrics import REGISTRY
+from workers import BackgroundRunner
+
+class StartupTimer:
+    """Records when each startup phase finished, relative to the start of this module"""
+    def __init__(self, start):
+        self.start = start
+        self.marks = {}
+        self.engine_timings = {}
+    
+    def mark(self, phase):
+        self.marks[phase] = time.perf_counter() - self.start
+    
+    def report(self):
+        """Format the recorded phases as a small table in milliseconds"""
+        lines = ["Startup timings (ms since start):"]
+        lines += [f"  {phase:<12}{seconds * 1000:>9.1f}" for phase, seconds in self.marks.items()]
+        if self.engine_timings:
+            lines.append("Engine stages (ms):")
+            lines += [f"  {stage:<12}{seconds * 1000:>9.1f}" for stage, seconds in self.engine_timings.items()]
+        return "\n".join(lines)
+
 
 class StyledMovieRecommender:
-    def __init__(self, root):
+    def __init__(self, root, csv_path=None, timer=None, show_timings=False):
         self.root = root
+        self.timer = timer or StartupTimer(time.perf_counter())
+        self.show_timings = show_timings
+        self.timer.mark("imports")
         self.root.title("🎬 MovieMagic Recommender")
         self.root.geometry("900x700")
         self.root.configure(bg="#2c3e50")
@@ -45,8 +70,11 @@ class StyledMovieRecommender:
         self.style.configure('Treeview.Heading', background=self.primary_color, foreground=self.text_color)
         self.style.map('Treeview', background=[('selected', self.secondary_color)])
         
-        # Set the CSV file path
-        self.csv_path = "D:/Project/Movies Recommendation system/movies.csv"
+        # Worker threads for model building, queries and charts
+        self.runner = BackgroundRunner(self.root)
+        
+        # Set the CSV file path, defaulting to the dataset shipped next to this script
+        self.csv_path = csv_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "movies.csv")
         
         # Check if file exists
         if not os.path.exists(self.csv_path):
@@ -54,55 +82,57 @@ class StyledMovieRecommender:
             self.root.destroy()
             return
         
-        # Load data
-        try:
-            self.movies = self._load_and_preprocess_data(self.csv_path)
-            self._build_models()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load data:\n{str(e)}")
-            self.root.destroy()
-            return
-        
-        # Create GUI
+        # Create GUI, then load data in the background so the window stays responsive
+        self.engine = None
         self._create_widgets()
+        self.root.after_idle(self.timer.mark, "first_paint")
+        self._start_loading()
+    
+    def _start_loading(self):
+        """Build the recommendation engine on a worker thread"""
+        self.recommend_btn.state(['disabled'])
+        self._set_busy("⏳ Loading movies...")
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(self.csv_path)), ".moviemagic_cache")
+        self.runner.submit(partial(self._build_engine, self.csv_path, cache_dir),
+                           on_done=self._on_engine_ready, on_error=self._on_load_error, channel='build')
     
-    def _load_and_preprocess_data(self, file_path):
-        """Load and preprocess the movie data"""
-        movies = pd.read_csv(file_path)
-        
-        # Clean data
-        movies['Worldwide Gross'] = movies['Worldwide Gross'].str.replace(r'[\$, ]', '', regex=True).astype(float)
-        movies['Profitability'] = movies['Profitability'].replace(0, np.nan)
-        
-        # Clean Year column
-        if pd.api.types.is_datetime64_any_dtype(movies['Year']):
-            movies['Year'] = movies['Year'].dt.year
-        elif isinstance(movies['Year'].iloc[0], str):
-            try:
-                movies['Year'] = movies['Year'].str.extract(r'(\d{4})').astype(float)
-            except:
-                pass
-        
-        # Create combined features
-        movies['features'] = (
-            movies['Film'] + ' ' + 
-            movies['Genre'] + ' ' + 
-            movies['Lead Studio'].fillna('') + ' ' + 
-            movies['Year'].astype(str)
-        )
-        
-        return movies
+    @staticmethod
+    def _build_engine(csv_path, cache_dir):
+        """Import and build the engine (runs on a worker thread)"""
+        from engine import RecommendationEngine
+        engine = RecommendationEngine(csv_path, cache_dir=cache_dir)
+        engine.title_index.warm()
+        return engine
     
-    def _build_models(self):
-        """Build recommendation models"""
-        self.tfidf = TfidfVectorizer(stop_words='english')
-        self.tfidf_matrix = self.tfidf.fit_transform(self.movies['features'])
-        self.content_similarity = cosine_similarity(self.tfidf_matrix, self.tfidf_matrix)
-        
-        numerical_features = ['Audience score %', 'Rotten Tomatoes %', 'Worldwide Gross', 'Profitability']
-        self.scaler = MinMaxScaler()
-        self.movies[numerical_features] = self.scaler.fit_transform(
-            self.movies[numerical_features].fillna(self.movies[numerical_features].median()))
+    def _on_engine_ready(self, engine):
+        """Fill the controls once the engine is built"""
+        self.engine = engine
+        self.movies = engine.movies
+        self.movie_combobox.configure(values=engine.suggest_titles("", 50))
+        self.genre_combobox.configure(values=sorted(self.movies['Genre'].unique().tolist()))
+        self.studio_combobox.configure(values=sorted(self.movies['Lead Studio'].unique().tolist()))
+        self.recommend_btn.state(['!disabled'])
+        self._set_idle(f"{len(self.movies)} movies loaded")
+        
+        self.timer.mark("engine_ready")
+        self.timer.engine_timings = engine.timings
+        if self.show_timings:
+            print(self.timer.report(), file=sys.stderr)
+    
+    def _on_load_error(self, e):
+        messagebox.showerror("Error", f"Failed to load data:\n{str(e)}")
+        self.root.destroy()
+    
+    def _set_busy(self, message):
+        """Show a status message with a running progress bar"""
+        self.status_label.config(text=message)
+        self.progress.pack(side=tk.RIGHT, padx=(10, 0))
+        self.progress.start(10)
+    
+    def _set_idle(self, message=""):
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.status_label.config(text=message)
     
     def _create_widgets(self):
         """Create styled GUI widgets"""
@@ -120,6 +150,11 @@ class StyledMovieRecommender:
                               foreground=self.primary_color)
         title_label.pack(side=tk.LEFT)
         
+        # Background work indicator
+        self.status_label = ttk.Label(header_frame, text="")
+        self.status_label.pack(side=tk.RIGHT)
+        self.progress = ttk.Progressbar(header_frame, mode='indeterminate', length=120)
+        
         # Content frame
         content_frame = ttk.Frame(main_frame)
         content_frame.pack(fill=tk.BOTH, expand=True)
@@ -144,11 +179,12 @@ class StyledMovieRecommender:
         movie_frame = ttk.LabelFrame(left_panel, text=" Movie Selection ", padding=10)
         movie_frame.pack(fill=tk.X, pady=(0, 15))
         
-        ttk.Label(movie_frame, text="Select a Movie:").pack(anchor=tk.W)
+        ttk.Label(movie_frame, text="Select a Movie (or several, separated by ;):").pack(anchor=tk.W)
         self.movie_var = tk.StringVar()
-        self.movie_combobox = ttk.Combobox(movie_frame, textvariable=self.movie_var, 
-                                          values=self.movies['Film'].tolist())
+        self.movie_combobox = ttk.Combobox(movie_frame, textvariable=self.movie_var)
         self.movie_combobox.pack(fill=tk.X, pady=5)
+        self.movie_combobox.bind('<KeyRelease>', self._on_title_typed)
+        self._typeahead_after = None
         
         # Filters
         filters_frame = ttk.LabelFrame(left_panel, text=" Recommendation Filters ", padding=10)
@@ -157,15 +193,13 @@ class StyledMovieRecommender:
         # Genre filter
         ttk.Label(filters_frame, text="Genre:").pack(anchor=tk.W)
         self.genre_var = tk.StringVar()
-        self.genre_combobox = ttk.Combobox(filters_frame, textvariable=self.genre_var, 
-                                          values=sorted(self.movies['Genre'].unique().tolist()))
+        self.genre_combobox = ttk.Combobox(filters_frame, textvariable=self.genre_var)
         self.genre_combobox.pack(fill=tk.X, pady=5)
         
         # Studio filter
         ttk.Label(filters_frame, text="Studio:").pack(anchor=tk.W)
         self.studio_var = tk.StringVar()
-        self.studio_combobox = ttk.Combobox(filters_frame, textvariable=self.studio_var, 
-                                           values=sorted(self.movies['Lead Studio'].unique().tolist()))
+        self.studio_combobox = ttk.Combobox(filters_frame, textvariable=self.studio_var)
         self.studio_combobox.pack(fill=tk.X, pady=5)
         
         # Score filters
@@ -227,108 +261,102 @@ class StyledMovieRecommender:
         self.style.configure('Accent.TButton', background=self.accent_color)
         self.style.map('Accent.TButton', background=[('active', '#c0392b')])
     
+    def _on_title_typed(self, event):
+        """Refresh the movie suggestions shortly after the user stops typing"""
+        if self.engine is None or event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        if self._typeahead_after is not None:
+            self.root.after_cancel(self._typeahead_after)
+        self._typeahead_after = self.root.after(150, self._update_title_suggestions)
+    
+    def _update_title_suggestions(self):
+        self._typeahead_after = None
+        # Complete the title being typed, keeping any earlier titles of a watchlist
+        earlier, _, text = self.movie_var.get().rpartition(';')
+        prefix = f"{earlier}; " if earlier else ""
+        self.runner.submit(self.engine.suggest_titles, text.strip(), 20,
+                           on_done=lambda titles: self.movie_combobox.configure(
+                               values=[prefix + title for title in titles]),
+                           channel='typeahead')
+    
+    def _selected_titles(self):
+        """Titles in the movie box; several can be given separated by ';'"""
+        return [title.strip() for title in self.movie_var.get().split(';') if title.strip()]
+    
+    def _check_title(self, movie_title):
+        """Whether a title is in the catalog; otherwise tell the user and suggest close matches"""
+        if self.engine.title_index.row(movie_title) is not None:
+            return True
+        suggestions = self.engine.suggest_titles(movie_title, 3)
+        message = f"No movie called \"{movie_title}\"."
+        if suggestions:
+            message += "\n\nDid you mean:\n" + "\n".join(f"  • {title}" for title in suggestions)
+        messagebox.showerror("Movie Not Found", message)
+        return False
+    
     def _update_slider_labels(self, *args):
         """Update slider value labels"""
         self.audience_score_label.config(text=f"{self.audience_score_var.get():.0f}%")
         self.critic_score_label.config(text=f"{self.critic_score_var.get():.0f}%")
     
     def _show_recommendations(self):
-        """Show recommendations in a new window"""
+        """Compute recommendations in the background and show them in a new window"""
         rec_type = self.rec_type.get()
         num_rec = self.num_rec_var.get()
-        
-        try:
-            if rec_type == "content":
-                movie_title = self.movie_var.get()
-                if not movie_title:
-                    messagebox.showerror("Error", "Please select a movie for content-based recommendations")
-                    return
-                recommendations = self._get_content_based_recommendations(movie_title, num_rec)
-                title = f"🎬 Movies similar to {movie_title}"
-                
-            elif rec_type == "feature":
-                preferences = {
-                    'Genre': self.genre_var.get() if self.genre_var.get() else None,
-                    'Studio': self.studio_var.get() if self.studio_var.get() else None,
-                    'Min Audience Score': self.audience_score_var.get(),
-                    'Min Critic Score': self.critic_score_var.get()
-                }
-                recommendations = self._get_feature_based_recommendations(preferences, num_rec)
-                title = "🔍 Feature-Based Recommendations"
-                
-            elif rec_type == "hybrid":
-                movie_title = self.movie_var.get()
-                if not movie_title:
-                    messagebox.showerror("Error", "Please select a movie for hybrid recommendations")
-                    return
-                preferences = {
-                    'Genre': self.genre_var.get() if self.genre_var.get() else None,
-                    'Studio': self.studio_var.get() if self.studio_var.get() else None,
-                    'Min Audience Score': self.audience_score_var.get(),
-                    'Min Critic Score': self.critic_score_var.get()
-                }
-                recommendations = self._get_hybrid_recommendations(movie_title, preferences, num_rec)
-                title = f"✨ Hybrid Recommendations based on {movie_title}"
-            
-            if recommendations.empty:
-                messagebox.showinfo("No Results", "No recommendations found with the current filters")
+        preferences = {
+            'Genre': self.genre_var.get() if self.genre_var.get() else None,
+            'Studio': self.studio_var.get() if self.studio_var.get() else None,
+            'Min Audience Score': self.audience_score_var.get(),
+            'Min Critic Score': self.critic_score_var.get()
+        }
+        
+        if rec_type == "content":
+            titles = self._selected_titles()
+            if not titles:
+                messagebox.showerror("Error", "Please select a movie for content-based recommendations")
                 return
+            if not all(self._check_title(movie_title) for movie_title in titles):
+                return
+            if len(titles) > 1:
+                query = partial(self.engine.recommend_content_session, titles, num_rec)
+            else:
+                query = partial(self.engine.recommend_content, titles[0], num_rec)
+            title = f"🎬 Movies similar to {', '.join(titles)}"
             
-            # Create results window
-            self._create_results_window(title, recommendations)
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred: {str(e)}")
-    
-    def _get_content_based_recommendations(self, movie_title, top_n=5):
-        """Get content-based recommendations"""
-        try:
-            idx = self.movies[self.movies['Film'] == movie_title].index[0]
-            sim_scores = list(enumerate(self.content_similarity[idx]))
-            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-            sim_scores = sim_scores[1:top_n+1]
+        elif rec_type == "feature":
+            query = partial(self.engine.recommend_features, preferences, num_rec)
+            title = "🔍 Feature-Based Recommendations"
             
-            movie_indices = [i[0] for i in sim_scores]
-            return self.movies.iloc[movie_indices][['Film', 'Genre', 'Lead Studio', 'Year', 'Audience score %', 'Rotten Tomatoes %']]
-        except:
-            return pd.DataFrame()
-    
-    def _get_feature_based_recommendations(self, preferences, top_n=5):
-        """Get feature-based recommendations"""
-        filtered = self.movies.copy()
-        
-        if preferences.get('Genre'):
-            filtered = filtered[filtered['Genre'] == preferences['Genre']]
-        if preferences.get('Studio'):
-            filtered = filtered[filtered['Lead Studio'] == preferences['Studio']]
-        if preferences.get('Min Audience Score'):
-            filtered = filtered[filtered['Audience score %'] >= preferences['Min Audience Score']/100]
-        if preferences.get('Min Critic Score'):
-            filtered = filtered[filtered['Rotten Tomatoes %'] >= preferences['Min Critic Score']/100]
-        
-        if not filtered.empty:
-            filtered['Recommendation Score'] = (
-                filtered['Audience score %'] * 0.6 + 
-                filtered['Rotten Tomatoes %'] * 0.4
-            )
-            return filtered.sort_values('Recommendation Score', ascending=False).head(top_n)[
-                ['Film', 'Genre', 'Lead Studio', 'Year', 'Audience score %', 'Rotten Tomatoes %']
-            ]
-        return pd.DataFrame()
+        elif rec_type == "hybrid":
+            titles = self._selected_titles()
+            if not titles:
+                messagebox.showerror("Error", "Please select a movie for hybrid recommendations")
+                return
+            if not all(self._check_title(movie_title) for movie_title in titles):
+                return
+            if len(titles) > 1:
+                query = partial(self.engine.recommend_hybrid_session, titles, preferences, num_rec)
+            else:
+                query = partial(self.engine.recommend_hybrid, titles[0], preferences, num_rec)
+            title = f"✨ Hybrid Recommendations based on {', '.join(titles)}"
+        
+        # A newer query replaces any one still in flight
+        self._set_busy("🔎 Finding recommendations...")
+        self.runner.submit(query, on_done=partial(self._on_recommendations, title),
+                           on_error=self._on_query_error, channel='query')
     
-    def _get_hybrid_recommendations(self, movie_title, preferences, top_n=5):
-        """Get hybrid recommendations"""
-        content_recs = self._get_content_based_recommendations(movie_title, top_n)
-        feature_recs = self._get_feature_based_recommendations(preferences, top_n)
-        
-        combined = pd.concat([content_recs, feature_recs]).drop_duplicates(subset=['Film'])
-        
-        if not content_recs.empty and not feature_recs.empty:
-            combined['Priority'] = 0
-            combined.loc[combined['Film'].isin(content_recs['Film']), 'Priority'] = 1
-            combined = combined.sort_values(['Priority', 'Audience score %'], ascending=[False, False])
+    def _on_recommendations(self, title, recommendations):
+        self._set_idle()
+        if recommendations.empty:
+            messagebox.showinfo("No Results", "No recommendations found with the current filters")
+            return
         
-        return combined.head(top_n)
+        # Create results window
+        self._create_results_window(title, recommendations)
+    
+    def _on_query_error(self, e):
+        self._set_idle()
+        messagebox.showerror("Error", f"An error occurred: {str(e)}")
     
     def _create_results_window(self, title, recommendations):
         """Create a styled results window"""
@@ -367,8 +395,10 @@ class StyledMovieRecommender:
             tree.column(col, width=120, anchor=tk.CENTER)
         
         # Add data
-        for _, row in recommendations.iterrows():
-            tree.insert('', tk.END, values=list(row))
+        with REGISTRY.timer('treeview_populate'):
+            for _, row in recommendations.iterrows():
+                tree.insert('', tk.END, values=list(row))
+        REGISTRY.count('treeview_rows', len(recommendations))
         
         # Add scrollbars
         v_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=tree.yview)
@@ -398,28 +428,46 @@ class StyledMovieRecommender:
         close_btn.pack(side=tk.RIGHT, padx=5)
     
     def _show_genre_visualization(self, recommendations):
-        """Show styled genre distribution visualization"""
-        # Create figure with dark theme
-        plt.style.use('dark_background')
-        fig, ax = plt.subplots(figsize=(8, 4), facecolor='#2c3e50')
-        ax.set_facecolor('#2c3e50')
-        
-        # Custom color palette
-        palette = sns.color_palette("husl", len(recommendations['Genre'].unique()))
-        
-        # Create plot
-        sns.countplot(data=recommendations, y='Genre', 
-                     order=recommendations['Genre'].value_counts().index,
-                     palette=palette, ax=ax)
-        
-        plt.title('Genre Distribution in Recommendations', color='white', pad=20)
-        plt.tight_layout()
+        """Render the genre chart in the background, then show it"""
+        self._set_busy("📊 Drawing chart...")
+        self.runner.submit(self._render_genre_chart, recommendations,
+                           on_done=self._show_chart_window, on_error=self._on_query_error, channel='plot')
+    
+    @REGISTRY.timed('chart_render', profile=True)
+    def _render_genre_chart(self, recommendations):
+        """Render the styled genre distribution chart to PNG bytes (runs on a worker thread)"""
+        import matplotlib
+        from matplotlib.figure import Figure
+        import seaborn as sns
+        
+        genres = recommendations['Genre'].astype(str)
+        
+        # Create figure with dark theme; Figure avoids pyplot's global state off the main thread
+        with matplotlib.style.context('dark_background'):
+            fig = Figure(figsize=(8, 4), facecolor='#2c3e50')
+            ax = fig.subplots()
+            ax.set_facecolor('#2c3e50')
+            
+            # Custom color palette
+            palette = sns.color_palette("husl", genres.nunique())
+            
+            # Create plot
+            sns.countplot(y=genres, hue=genres, order=genres.value_counts().index,
+                         palette=palette, legend=False, ax=ax)
+            
+            ax.set_title('Genre Distribution in Recommendations', color='white', pad=20)
+            fig.tight_layout()
+            
+            # Save to buffer
+            buf = io.BytesIO()
+            fig.savefig(buf, format='png', facecolor=fig.get_facecolor())
+        return buf.getvalue()
+    
+    def _show_chart_window(self, png):
+        """Show a rendered chart in a new window"""
+        from PIL import Image, ImageTk
         
-        # Save to buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', facecolor=fig.get_facecolor())
-        buf.seek(0)
-        plt.close()
+        self._set_idle()
         
         # Create visualization window
         vis_window = tk.Toplevel(self.root)
@@ -428,7 +476,7 @@ class StyledMovieRecommender:
         vis_window.configure(bg=self.bg_color)
         
         # Display image
-        img = Image.open(buf)
+        img = Image.open(io.BytesIO(png))
         photo = ImageTk.PhotoImage(img)
         
         label = ttk.Label(vis_window, image=photo)
@@ -442,6 +490,20 @@ class StyledMovieRecommender:
 
 # Run the application
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="MovieMagic Recommender")
+    parser.add_argument("csv_path", nargs="?", default=None, help="movies CSV (defaults to movies.csv next to this script)")
+    parser.add_argument("--timings", action="store_true", help="print a startup timing report once the engine is ready")
+    parser.add_argument("--metrics", default=None,
+                        help="on exit, write stage metrics to this file (.prom for Prometheus text, else a JSON log line)")
+    parser.add_argument("--profile-dir", default=None, help="save a cProfile of every query and chart to this directory")
+    args = parser.parse_args()
+    REGISTRY.profile_dir = args.profile_dir
+    
     root = tk.Tk()
-    app = StyledMovieRecommender(root)
-    root.mainloop()
\ No newline at end of file
+    app = StyledMovieRecommender(root, args.csv_path, timer=StartupTimer(_START), show_timings=args.timings)
+    root.mainloop()
+    app.runner.shutdown()
+    if args.metrics:
+        REGISTRY.write(args.metrics)
\ No newline at end of file
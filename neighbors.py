@@ -0,0 +1,228 @@
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class NeighborIndex:
+    """Top-k most similar movies per title, stored as int32 ids and float32 scores"""
+
+    def __init__(self, indices, scores):
+        self.indices = indices
+        self.scores = scores
+
+    @property
+    def k(self):
+        return self.indices.shape[1]
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    @classmethod
+    def build(cls, matrix, k=50, block_elements=2**24, n_jobs=1):
+        """Build the index from L2-normalised TF-IDF rows, one block of rows at a time
+
+        With n_jobs > 1 (or -1 for every CPU) the blocks are computed on a
+        process pool; the result is identical to the single-process build.
+        """
+        matrix = matrix.tocsr()
+        n_rows = matrix.shape[0]
+        k = max(0, min(k, n_rows - 1))
+
+        indices = np.empty((n_rows, k), dtype=np.int32)
+        scores = np.empty((n_rows, k), dtype=np.float32)
+        if k == 0:
+            return cls(indices, scores)
+
+        # Size blocks so the dense similarity slab stays within the element budget
+        block_rows = max(1, block_elements // n_rows)
+        n_jobs = resolve_jobs(n_jobs)
+        if n_jobs > 1 and n_rows > 1:
+            # Every worker needs at least one block
+            block_rows = min(block_rows, -(-n_rows // n_jobs))
+            _build_parallel(matrix, indices, scores, k, block_rows, n_jobs)
+            return cls(indices, scores)
+
+        transposed = matrix.T.tocsc()
+        for start in range(0, n_rows, block_rows):
+            stop = min(start + block_rows, n_rows)
+            block_indices, block_scores = _top_k_block(
+                matrix[start:stop], transposed, np.arange(start, stop), k)
+            indices[start:stop] = block_indices
+            scores[start:stop] = block_scores
+
+        return cls(indices, scores)
+
+    def add_rows(self, matrix, k=50, block_elements=2**24):
+        """Extend the index with rows appended to the end of matrix
+
+        Only the new rows are compared against the catalog, and existing lists
+        are touched only where a new row beats their current worst neighbour.
+        """
+        matrix = matrix.tocsr()
+        n_old, n_rows = len(self), matrix.shape[0]
+        k = max(0, min(k, n_rows - 1))
+
+        # A catalog with fewer than k rows has short lists everywhere; rebuild it
+        if self.k < k:
+            rebuilt = NeighborIndex.build(matrix, k, block_elements)
+            self.indices, self.scores = rebuilt.indices, rebuilt.scores
+            return
+
+        indices = np.empty((n_rows, k), dtype=np.int32)
+        scores = np.empty((n_rows, k), dtype=np.float32)
+        indices[:n_old] = self.indices
+        scores[:n_old] = self.scores
+        if k == 0:
+            self.indices, self.scores = indices, scores
+            return
+
+        block_rows = max(1, block_elements // n_rows)
+        transposed = matrix.T.tocsc()
+        existing = matrix[:n_old]
+        for start in range(n_old, n_rows, block_rows):
+            stop = min(start + block_rows, n_rows)
+            block = matrix[start:stop]
+            indices[start:stop], scores[start:stop] = _top_k_block(
+                block, transposed, np.arange(start, stop), k)
+
+            # Similarity of every existing row to this block of new rows
+            incoming = (existing @ block.T).toarray().astype(np.float32, copy=False)
+            affected = np.flatnonzero((incoming > scores[:n_old, k - 1, None]).any(axis=1))
+            if affected.size:
+                block_ids = np.broadcast_to(np.arange(start, stop), (affected.size, stop - start))
+                indices[affected], scores[affected] = _merge_top_k(
+                    indices[affected], scores[affected], block_ids, incoming[affected], k)
+
+        self.indices, self.scores = indices, scores
+
+    def remove_rows(self, matrix, keep, k=50, block_elements=2**24):
+        """Drop the rows where keep is False; matrix holds only the kept rows
+
+        Surviving lists are renumbered, and only the lists that referenced a
+        removed row are recomputed against the remaining catalog.
+        """
+        matrix = matrix.tocsr()
+        n_rows = matrix.shape[0]
+        k = max(0, min(k, n_rows - 1))
+
+        new_ids = np.cumsum(keep, dtype=np.int64) - 1
+        new_ids[~keep] = -1
+        indices = new_ids[self.indices[keep]].astype(np.int32)
+        scores = np.array(self.scores[keep], dtype=np.float32)
+
+        affected = np.flatnonzero((indices < 0).any(axis=1) | (self.k < k))
+        indices, scores = indices[:, :k], scores[:, :k]
+        if k and affected.size:
+            block_rows = max(1, block_elements // n_rows)
+            transposed = matrix.T.tocsc()
+            for start in range(0, affected.size, block_rows):
+                rows = affected[start:start + block_rows]
+                indices[rows], scores[rows] = _top_k_block(matrix[rows], transposed, rows, k)
+
+        self.indices, self.scores = indices, scores
+
+    def neighbors(self, row, top_n=None):
+        """Return (indices, scores) of the closest movies to a row, best first"""
+        top_n = self.k if top_n is None else min(top_n, self.k)
+        return self.indices[row, :top_n], self.scores[row, :top_n]
+
+
+def resolve_jobs(n_jobs):
+    """Number of worker processes for n_jobs, where -1 (or any negative) means every CPU"""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, n_jobs)
+
+
+def _build_parallel(matrix, indices, scores, k, block_rows, n_jobs):
+    """Fill indices and scores block by block on a pool of n_jobs processes
+
+    The CSR arrays of the matrix and of its transpose are written once to
+    .npy files that every worker memory-maps read-only, instead of being
+    pickled into each task. Workers write their rows straight into
+    memory-mapped output arrays, so only block boundaries cross processes.
+    """
+    n_rows = matrix.shape[0]
+    with tempfile.TemporaryDirectory(prefix='moviemagic-neighbors-') as tmp_dir:
+        _save_sparse(tmp_dir, 'rows', matrix)
+        _save_sparse(tmp_dir, 'columns', matrix.T.tocsc())
+        out_indices = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'indices.npy'), mode='w+', dtype=np.int32, shape=indices.shape)
+        out_scores = np.lib.format.open_memmap(
+            os.path.join(tmp_dir, 'scores.npy'), mode='w+', dtype=np.float32, shape=scores.shape)
+        out_indices.flush()
+        out_scores.flush()
+
+        starts = range(0, n_rows, block_rows)
+        stops = [min(start + block_rows, n_rows) for start in starts]
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(starts)), mp_context=context) as pool:
+            # Consume the iterator so a failure in any worker is raised here
+            for _ in pool.map(_build_block, [tmp_dir] * len(starts), [matrix.shape] * len(starts),
+                              [k] * len(starts), starts, stops):
+                pass
+
+        indices[:] = out_indices
+        scores[:] = out_scores
+        # Release the maps before the directory is removed (required on Windows)
+        del out_indices, out_scores
+
+
+def _build_block(tmp_dir, shape, k, start, stop):
+    """Worker: compute rows start:stop from the memory-mapped matrix into the shared output"""
+    matrix = _load_sparse(tmp_dir, 'rows', sp.csr_matrix, shape)
+    transposed = _load_sparse(tmp_dir, 'columns', sp.csc_matrix, (shape[1], shape[0]))
+    block_indices, block_scores = _top_k_block(
+        matrix[start:stop], transposed, np.arange(start, stop), k)
+
+    out_indices = np.load(os.path.join(tmp_dir, 'indices.npy'), mmap_mode='r+')
+    out_scores = np.load(os.path.join(tmp_dir, 'scores.npy'), mmap_mode='r+')
+    out_indices[start:stop] = block_indices
+    out_scores[start:stop] = block_scores
+    out_indices.flush()
+    out_scores.flush()
+
+
+def _save_sparse(directory, name, matrix):
+    for part in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(directory, f'{name}_{part}.npy'), getattr(matrix, part))
+
+
+def _load_sparse(directory, name, kind, shape):
+    parts = [np.load(os.path.join(directory, f'{name}_{part}.npy'), mmap_mode='r')
+             for part in ('data', 'indices', 'indptr')]
+    return kind(tuple(parts), shape=shape, copy=False)
+
+
+def _top_k_block(block, transposed, self_ids, k):
+    """Top-k neighbours for a block of rows, excluding each row itself"""
+    similarity = (block @ transposed).toarray().astype(np.float32, copy=False)
+    similarity[np.arange(similarity.shape[0]), self_ids] = -np.inf
+
+    candidates = np.sort(np.argpartition(-similarity, k - 1, axis=1)[:, :k], axis=1)
+    candidate_scores = np.take_along_axis(similarity, candidates, axis=1)
+
+    # Order each row by descending score, breaking ties on the lower movie id
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')
+    return (np.take_along_axis(candidates, order, axis=1).astype(np.int32),
+            np.take_along_axis(candidate_scores, order, axis=1))
+
+
+def _merge_top_k(indices, scores, extra_indices, extra_scores, k):
+    """Merge existing neighbour lists with extra candidates, keeping the best k"""
+    candidates = np.hstack([indices, extra_indices])
+    candidate_scores = np.hstack([scores, extra_scores])
+
+    by_id = np.argsort(candidates, axis=1, kind='stable')
+    candidates = np.take_along_axis(candidates, by_id, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, by_id, axis=1)
+
+    order = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+    return (np.take_along_axis(candidates, order, axis=1).astype(np.int32),
+            np.take_along_axis(candidate_scores, order, axis=1))
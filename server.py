@@ -0,0 +1,386 @@
+"""Headless HTTP service for MovieMagic recommendations
+
+Run with ``python server.py movies.csv --port 8000``. Endpoints (all GET,
+JSON responses):
+
+    /health
+    /stats
+    /recommend/content?title=WALL-E&n=5
+    /recommend/feature?genre=Comedy&studio=Disney&min_audience=50&min_critic=50&n=5
+    /recommend/hybrid?title=WALL-E&genre=Comedy&min_audience=50&n=5
+    /recommend/session/content?title=WALL-E&title=Up&weight=2&weight=1&n=5
+    /recommend/session/hybrid?title=WALL-E&title=Up&genre=Comedy&n=5
+    /titles?q=wal&n=10
+    /metrics                (Prometheus text; /metrics?format=json for JSON)
+
+Content and hybrid requests that arrive within a short window are answered
+from one batched similarity lookup.
+"""
+import argparse
+import asyncio
+import json
+import math
+import signal
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from engine import DISPLAY_COLUMNS, RecommendationEngine, check_seed_weights
+from metrics import REGISTRY
+
+MAX_RESULTS = 100
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               500: 'Internal Server Error'}
+
+
+class BadRequest(Exception):
+    """A request the server can answer with a 4xx status"""
+
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class MicroBatcher:
+    """Collect items submitted within a short window and process them in one call
+
+    process receives the list of items and must return one result per item;
+    it runs in the default executor so the event loop keeps serving.
+    """
+
+    def __init__(self, process, window=0.002, max_batch=64):
+        self.process = process
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._flush_handle = None
+        self._running = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        self.batches += 1
+        self.items += len(items)
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.process, items)
+        except Exception as e:
+            results = [e] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class RecommendationServer:
+    """asyncio HTTP server around one shared RecommendationEngine"""
+
+    def __init__(self, engine, host='127.0.0.1', port=8000, batch_window=0.002, max_batch=64):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.content_batcher = MicroBatcher(self._content_batch, batch_window, max_batch)
+        self.hybrid_batcher = MicroBatcher(self._hybrid_batch, batch_window, max_batch)
+        self._server = None
+
+    async def start(self):
+        """Start listening; with port 0 the chosen port is stored on self.port"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                method, target, version = (request_line.decode('latin-1').split() + ['', '', ''])[:3]
+                with REGISTRY.timer('http_request'):
+                    status, payload = await self._dispatch(method, target)
+                REGISTRY.count(f'http_responses_{status}')
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+
+                # Handlers return text for non-JSON responses such as the Prometheus snapshot
+                if isinstance(payload, str):
+                    body, content_type = payload.encode(), 'text/plain; version=0.0.4'
+                else:
+                    body, content_type = json.dumps(payload, default=_json_default).encode(), 'application/json'
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target):
+        if method != 'GET':
+            return 405, {'error': 'only GET is supported'}
+        url = urlsplit(target)
+        query = _Query(parse_qs(url.query))
+        routes = {
+            '/health': self._health,
+            '/stats': self._stats,
+            '/recommend/content': self._content,
+            '/recommend/feature': self._feature,
+            '/recommend/hybrid': self._hybrid,
+            '/recommend/session/content': self._content_session,
+            '/recommend/session/hybrid': self._hybrid_session,
+            '/titles': self._titles,
+            '/metrics': self._metrics,
+        }
+        handler = routes.get(url.path.rstrip('/') or '/')
+        if handler is None:
+            return 404, {'error': f'unknown path {url.path}'}
+        try:
+            return 200, await handler(query)
+        except BadRequest as e:
+            return e.status, {'error': str(e), **e.details}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+    async def _health(self, query):
+        return {'status': 'ok', 'movies': len(self.engine.movies)}
+
+    async def _stats(self, query):
+        return {
+            'result_cache': self.engine.result_cache.stats(),
+            'content_batches': {'batches': self.content_batcher.batches, 'requests': self.content_batcher.items},
+            'hybrid_batches': {'batches': self.hybrid_batcher.batches, 'requests': self.hybrid_batcher.items},
+        }
+
+    async def _metrics(self, query):
+        if query.get('format') == 'json':
+            return REGISTRY.snapshot()
+        return REGISTRY.to_prometheus()
+
+    async def _titles(self, query):
+        return {'titles': self.engine.suggest_titles(query.get('q', ''), _top_n(query))}
+
+    async def _content(self, query):
+        title, top_n = _required(query, 'title'), _top_n(query)
+        rows, scores = await self.content_batcher.submit((title, top_n))
+        return self._response(title, rows, scores)
+
+    async def _feature(self, query):
+        query_fn = partial(self.engine.recommend_features, _preferences(query), _top_n(query))
+        recommendations = await asyncio.get_running_loop().run_in_executor(None, query_fn)
+        return {'recommendations': _records(recommendations)}
+
+    async def _hybrid(self, query):
+        title, top_n = _required(query, 'title'), _top_n(query)
+        rows, scores = await self.hybrid_batcher.submit((title, _preferences(query), top_n))
+        return self._response(title, rows, scores)
+
+    async def _content_session(self, query):
+        titles, seed_weights = self._session(query)
+        query_fn = partial(self.engine.recommend_content_session, titles, _top_n(query), seed_weights)
+        recommendations = await asyncio.get_running_loop().run_in_executor(None, query_fn)
+        return {'titles': titles, 'recommendations': _records(recommendations)}
+
+    async def _hybrid_session(self, query):
+        titles, seed_weights = self._session(query)
+        query_fn = partial(self.engine.recommend_hybrid_session, titles, _preferences(query), _top_n(query),
+                           seed_weights)
+        recommendations = await asyncio.get_running_loop().run_in_executor(None, query_fn)
+        return {'titles': titles, 'recommendations': _records(recommendations)}
+
+    def _session(self, query):
+        """Seed titles and optional per-seed weights of a session request"""
+        titles = query.getlist('title')
+        if not titles:
+            raise BadRequest("missing query parameter 'title'")
+        unknown = [title for title, row in zip(titles, self.engine.title_rows(titles)) if row < 0]
+        if unknown:
+            raise BadRequest(f'unknown titles {unknown!r}', status=404,
+                             suggestions={title: self.engine.suggest_titles(title, 5) for title in unknown})
+        weights = query.getlist('weight')
+        if not weights:
+            return titles, None
+        if len(weights) != len(titles):
+            raise BadRequest("give one 'weight' per 'title' or none at all")
+        try:
+            weights = [float(weight) for weight in weights]
+        except ValueError:
+            raise BadRequest("'weight' must be a number")
+        try:
+            check_seed_weights(weights)
+        except ValueError as e:
+            raise BadRequest(f"'weight': {e}")
+        return titles, weights
+
+    def _response(self, title, rows, scores):
+        if rows is None:
+            raise BadRequest(f'unknown title {title!r}', status=404,
+                             suggestions=self.engine.suggest_titles(title, 5))
+        recommendations = self.engine.movies.iloc[rows][DISPLAY_COLUMNS].assign(Score=scores)
+        return {'title': title, 'recommendations': _records(recommendations)}
+
+    def _content_batch(self, items):
+        titles = [title for title, _ in items]
+        known = self.engine.title_rows(titles) >= 0
+        indices, scores = self.engine.recommend_content_many(titles, max(n for _, n in items))
+        results = []
+        for i, (_, n) in enumerate(items):
+            if not known[i]:
+                results.append((None, None))
+                continue
+            # Lists shortened by duplicate titles are padded with -1
+            found = indices[i, :n] >= 0
+            results.append((indices[i, :n][found], scores[i, :n][found]))
+        return results
+
+    def _hybrid_batch(self, items):
+        titles = [title for title, _, _ in items]
+        known = self.engine.title_rows(titles) >= 0
+        results = self.engine.recommend_hybrid_many(
+            titles, [preferences for _, preferences, _ in items], max(n for _, _, n in items))
+        return [(rows[:n], scores[:n]) if is_known else (None, None)
+                for (rows, scores), (_, _, n), is_known in zip(results, items, known)]
+
+
+class _Query(dict):
+    """Query parameters by name, holding the last value given; getlist returns every value"""
+
+    def __init__(self, params):
+        super().__init__((name, values[-1]) for name, values in params.items())
+        self._params = params
+
+    def getlist(self, name):
+        return list(self._params.get(name, []))
+
+
+def _required(query, name):
+    value = query.get(name)
+    if not value:
+        raise BadRequest(f'missing query parameter {name!r}')
+    return value
+
+
+def _top_n(query):
+    try:
+        top_n = int(query.get('n', 5))
+    except ValueError:
+        raise BadRequest("'n' must be an integer")
+    if not 1 <= top_n <= MAX_RESULTS:
+        raise BadRequest(f"'n' must be between 1 and {MAX_RESULTS}")
+    return top_n
+
+
+def _preferences(query):
+    try:
+        preferences = {
+            'Genre': query.get('genre') or None,
+            'Studio': query.get('studio') or None,
+            'Min Audience Score': float(query.get('min_audience', 0)),
+            'Min Critic Score': float(query.get('min_critic', 0)),
+        }
+    except ValueError:
+        raise BadRequest("'min_audience' and 'min_critic' must be numbers")
+    if not (math.isfinite(preferences['Min Audience Score']) and math.isfinite(preferences['Min Critic Score'])):
+        raise BadRequest("'min_audience' and 'min_critic' must be finite numbers")
+    return preferences
+
+
+def _records(frame):
+    return frame.to_dict(orient='records')
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+async def _serve(args):
+    engine = RecommendationEngine(args.csv_path, cache_dir=args.cache_dir, n_jobs=args.jobs)
+    server = RecommendationServer(engine, args.host, args.port, args.batch_window_ms / 1000)
+    await server.start()
+    print(f"Serving {len(engine.movies)} movies on http://{server.host}:{server.port}", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve MovieMagic recommendations over HTTP")
+    parser.add_argument('csv_path', nargs='?', default='movies.csv')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-dir', default=None, help="artifact cache directory")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="processes for the model build (-1 for every CPU)")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="how long to collect concurrent requests into one batch")
+    parser.add_argument('--profile-dir', default=None,
+                        help="save a cProfile of every recommendation query to this directory")
+    args = parser.parse_args(argv)
+    REGISTRY.profile_dir = args.profile_dir
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
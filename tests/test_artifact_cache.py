@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from artifact_cache import MANIFEST, ArtifactCache
+from benchmark import generate_catalog
+from engine import RecommendationEngine
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return generate_catalog(300, seed=1)
+
+
+def _entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir)
+                  if os.path.exists(os.path.join(cache_dir, name, MANIFEST)))
+
+
+def test_prune_leaves_unrelated_files_alone(tmp_path, catalog):
+    (tmp_path / 'important_project').mkdir()
+    (tmp_path / 'important_project' / 'notes.txt').write_text('keep me')
+    (tmp_path / 'v3-not-a-cache-key').mkdir()
+    (tmp_path / 'readme.txt').write_text('keep me too')
+
+    for n_neighbors in (5, 6, 7, 8, 9, 10):
+        RecommendationEngine(catalog, n_neighbors=n_neighbors, cache_dir=str(tmp_path))
+
+    assert (tmp_path / 'important_project' / 'notes.txt').read_text() == 'keep me'
+    assert (tmp_path / 'v3-not-a-cache-key').is_dir()
+    assert (tmp_path / 'readme.txt').exists()
+    assert len(_entries(tmp_path)) == 4
+
+
+def test_configurations_sharing_a_directory_keep_their_entries(tmp_path, catalog):
+    RecommendationEngine(catalog, n_neighbors=10, cache_dir=str(tmp_path))
+    RecommendationEngine(catalog, n_neighbors=5, cache_dir=str(tmp_path))
+    assert len(_entries(tmp_path)) == 2
+
+    warm = RecommendationEngine(catalog, n_neighbors=10, cache_dir=str(tmp_path))
+    assert 'cache_load' in warm.timings
+
+
+def test_saving_an_existing_key_succeeds(tmp_path, catalog):
+    engine = RecommendationEngine(catalog, n_neighbors=5, cache_dir=str(tmp_path))
+    key, = _entries(tmp_path)
+
+    # A second process finishing the same build finds the entry already in place
+    assert ArtifactCache(str(tmp_path)).save(key, engine._artifacts())
+    assert _entries(tmp_path) == [key]
+    assert not [name for name in os.listdir(tmp_path) if name.startswith('.tmp-')]
+
+
+def test_save_failures_do_not_break_the_engine(tmp_path, catalog):
+    blocked = tmp_path / 'not-a-directory'
+    blocked.write_text('')
+    engine = RecommendationEngine(catalog, n_neighbors=5, cache_dir=str(blocked))
+    assert len(engine.recommend_content(engine.movies['Film'][0], 3)) == 3
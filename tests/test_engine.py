@@ -0,0 +1,126 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalog
+from engine import RecommendationEngine
+from neighbors import NeighborIndex
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'movies.csv')
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return RecommendationEngine(generate_catalog(500, seed=4), n_neighbors=20)
+
+
+@pytest.mark.parametrize('seed_weights', [[np.nan, 1], [np.inf, 1], [-1, 2], [0, 0]])
+def test_session_rejects_invalid_seed_weights(engine, seed_weights):
+    titles = list(engine.title_index.titles[:2])
+    with pytest.raises(ValueError):
+        engine.recommend_content_session(titles, 5, seed_weights=seed_weights)
+    with pytest.raises(ValueError):
+        engine.recommend_hybrid_session(titles, {}, 5, seed_weights=seed_weights)
+
+
+def test_session_excludes_the_seeds(engine):
+    titles = list(engine.title_index.titles[:3])
+    for recommendations in (engine.recommend_content_session(titles, 10, seed_weights=[2, 1, 0]),
+                            engine.recommend_hybrid_session(titles, {}, 10, seed_weights=[2, 1, 0])):
+        assert len(recommendations) == 10
+        assert not set(recommendations['Film']) & set(titles)
+
+
+def test_spellings_of_a_title_share_one_cache_entry(engine):
+    title = engine.title_index.titles[0]
+    spellings = [title, title.lower(), f'  {title.upper()} ']
+    engine.result_cache.clear()
+    before = engine.result_cache.stats()
+
+    content = [engine.recommend_content(spelling, 5) for spelling in spellings]
+    hybrid = [engine.recommend_hybrid(spelling, {'Min Audience Score': 20}, 5) for spelling in spellings]
+
+    stats = engine.result_cache.stats()
+    assert stats['misses'] - before['misses'] == 2
+    assert stats['size'] == 2
+    assert all(frame.equals(content[0]) for frame in content)
+    assert all(frame.equals(hybrid[0]) for frame in hybrid)
+
+
+def test_add_and_remove_update_indexes_like_a_rebuild():
+    catalog = generate_catalog(400, seed=5)
+    engine = RecommendationEngine(catalog.iloc[:300], n_neighbors=10)
+    engine.suggest_titles('ka')
+    engine.add_movies(catalog.iloc[300:])
+    engine.remove_movies(list(catalog['Film'].iloc[::7]))
+    updated = engine.title_index, engine.filter_index, engine._first_occurrence
+
+    engine._build_indexes()
+    title_index, filter_index, first_occurrence = engine.title_index, engine.filter_index, engine._first_occurrence
+    assert np.array_equal(updated[2], first_occurrence)
+    assert updated[0].titles == title_index.titles
+    assert np.array_equal(updated[0].rows, title_index.rows)
+    for text in ['', 'ka', 'elmi', title_index.titles[0].upper(), title_index.titles[1][:-2]]:
+        assert updated[0].search(text) == title_index.search(text)
+    for preferences in [{'Genre': catalog['Genre'].iloc[0]}, {'Studio': catalog['Lead Studio'].iloc[0]},
+                        {'Min Audience Score': 40, 'Min Critic Score': 60}]:
+        assert np.array_equal(updated[1].top_n(preferences, 20), filter_index.top_n(preferences, 20))
+
+
+def new_movie(**values):
+    movie = {'Film': 'Brand New Film', 'Genre': 'Drama', 'Lead Studio': 'Lionsgate', 'Audience score %': 50,
+             'Profitability': 1.5, 'Rotten Tomatoes %': 60, 'Worldwide Gross': '$10.00 ', 'Year': 2024}
+    movie.update(values)
+    return movie
+
+
+def engine_state(engine):
+    return (engine.movies.copy(), engine.tfidf_matrix.shape, len(engine.tfidf.vocabulary_),
+            engine.content_neighbors.indices.copy(), engine.scaler.data_min_.copy(), engine.scaler.data_max_.copy())
+
+
+def test_failed_add_leaves_the_engine_unchanged(monkeypatch):
+    engine = RecommendationEngine(generate_catalog(250, seed=6), n_neighbors=10)
+    before = engine_state(engine)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('add failed')
+    # Fails after the vocabulary, matrix and scaler range (audience score 500) have been extended
+    monkeypatch.setattr(NeighborIndex, 'add_rows', fail)
+    with pytest.raises(RuntimeError):
+        engine.add_movies([new_movie(**{'Film': 'Unseen Zyxwv', 'Audience score %': 500})])
+    monkeypatch.undo()
+
+    after = engine_state(engine)
+    assert after[0].equals(before[0])
+    assert after[1:3] == before[1:3]
+    assert all(np.array_equal(a, b) for a, b in zip(after[3:], before[3:]))
+
+    assert list(engine.add_movies([new_movie()])) == [250]
+    assert engine.tfidf_matrix.shape[0] == len(engine.content_neighbors) == len(engine.movies) == 251
+    assert engine.remove_movies(['Brand New Film']) == 1
+
+
+def test_add_movie_without_studio():
+    engine = RecommendationEngine(generate_catalog(250, seed=6), n_neighbors=10)
+    assert list(engine.add_movies([new_movie(**{'Lead Studio': None})])) == [250]
+    assert pd.isna(engine.movies['Lead Studio'].iloc[250])
+    assert engine.title_index.row('brand new film') == 250
+    assert len(engine.recommend_content('Brand New Film', 5)) == 5
+    assert len(engine.add_movies([])) == 0
+    assert len(engine.movies) == 251
+
+
+def test_content_recommendations_offer_each_title_once():
+    engine = RecommendationEngine(MOVIES_CSV, n_neighbors=20)
+    assert engine.movies['Film'].duplicated().any()
+    titles = list(engine.title_index.titles)
+    indices, scores = engine.recommend_content_many(titles, 15)
+    for title, row_ids, row_scores in zip(titles, indices, scores):
+        films = engine.recommend_content(title, 15)
+        assert len(films) == 15 and films['Film'].is_unique
+        assert title not in set(films['Film'])
+        assert list(row_ids) == list(films.index)
+        assert not np.isnan(row_scores).any()
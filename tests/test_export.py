@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+import export
+from engine import RecommendationEngine
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'movies.csv')
+
+
+def check_padding(ids, scores, top_n):
+    """Valid ids come first; the rest of each list is -1 with NaN scores"""
+    assert ids.shape == scores.shape == (len(ids), top_n)
+    valid = ids >= 0
+    assert np.array_equal(valid, np.arange(top_n) < valid.sum(axis=1, keepdims=True))
+    assert np.array_equal(np.isnan(scores), ~valid)
+
+
+def test_export_round_trip(tmp_path):
+    output = str(tmp_path / 'recommendations.npz')
+    export.main([MOVIES_CSV, '--output', output, '-k', '10', '--buckets', '--top-n', '15',
+                 '--chunk-rows', '7'])
+    engine = RecommendationEngine(MOVIES_CSV)
+
+    with np.load(output) as npz:
+        assert np.array_equal(npz['movie_id'], np.arange(len(engine.movies)))
+        assert list(npz['title']) == list(engine.movies['Film'])
+        assert np.array_equal(npz['neighbor_ids'], engine.content_neighbors.indices[:, :10])
+        assert np.array_equal(npz['neighbor_scores'], engine.content_neighbors.scores[:, :10])
+
+    with np.load(export.bucket_path(output, 'feature')) as npz:
+        check_padding(npz['movie_ids'], npz['scores'], 15)
+        # Genre + Studio pairs are small buckets, so some lists are padded
+        assert (npz['movie_ids'] < 0).any()
+        for genre, studio, ids in zip(npz['genre'], npz['studio'], npz['movie_ids']):
+            expected = engine.filter_index.top_n({'Genre': genre or None, 'Studio': studio or None}, 15)
+            assert np.array_equal(ids[ids >= 0], expected)
+
+    with np.load(export.bucket_path(output, 'hybrid')) as npz:
+        check_padding(npz['movie_ids'], npz['scores'], 15)
+        assert len(npz['movie_id']) == 2 * len(engine.title_index)
+        assert set(npz['title']) == set(engine.title_index.titles)
+    assert sorted(os.listdir(tmp_path)) == ['recommendations.feature.npz', 'recommendations.hybrid.npz',
+                                            'recommendations.npz']
+
+
+def test_failed_export_leaves_no_file(tmp_path, monkeypatch):
+    output = str(tmp_path / 'recommendations.npz')
+
+    def fail(engine, path, *args):
+        with export.open_writer(path, [('movie_ids', np.int32, 2)], 10) as writer:
+            writer.write({'movie_ids': np.zeros((5, 2), dtype=np.int32)})
+            raise RuntimeError('export failed')
+    monkeypatch.setattr(export, 'export_feature_rankings', fail)
+
+    with pytest.raises(RuntimeError):
+        export.main([MOVIES_CSV, '--output', output, '--buckets'])
+    # The neighbour file was complete before the failure; nothing else is left behind
+    assert os.listdir(tmp_path) == ['recommendations.npz']
@@ -0,0 +1,84 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark import generate_catalog
+from filter_index import FilterIndex
+from loader import clean_catalog
+
+PREFERENCES = [
+    {'Genre': genre, 'Studio': studio, 'Min Audience Score': audience, 'Min Critic Score': critic}
+    for genre, studio, audience, critic in itertools.product(
+        [None, 'Comedy', 'Drama', 'Animation', 'No Such Genre'],
+        [None, 'Disney', 'Lionsgate', 'No Such Studio'],
+        [0, 40, 85],
+        [0, 50, 90])
+]
+
+
+def catalog(n_rows, seed):
+    """Cleaned catalog with scores scaled to 0..1 as in the engine, and some studios missing"""
+    movies = generate_catalog(n_rows, seed=seed)
+    movies.loc[::9, 'Lead Studio'] = None
+    movies = clean_catalog(movies)
+    for column in ['Audience score %', 'Rotten Tomatoes %']:
+        movies[column] = (movies[column] / 100).astype(np.float32)
+    return movies
+
+
+def mask_and_sort(movies, preferences, top_n):
+    """Row ids from the original filter-then-sort implementation, ties going to the lower row"""
+    filtered = movies
+    if preferences.get('Genre'):
+        filtered = filtered[filtered['Genre'] == preferences['Genre']]
+    if preferences.get('Studio'):
+        filtered = filtered[filtered['Lead Studio'] == preferences['Studio']]
+    if preferences.get('Min Audience Score'):
+        filtered = filtered[filtered['Audience score %'] >= preferences['Min Audience Score']/100]
+    if preferences.get('Min Critic Score'):
+        filtered = filtered[filtered['Rotten Tomatoes %'] >= preferences['Min Critic Score']/100]
+    score = filtered['Audience score %'] * 0.6 + filtered['Rotten Tomatoes %'] * 0.4
+    return score.sort_values(ascending=False, kind='stable').index[:top_n].to_numpy()
+
+
+def assert_matches_mask_and_sort(index, movies):
+    for preferences in PREFERENCES:
+        expected = mask_and_sort(movies, preferences, 10)
+        assert np.array_equal(index.top_n(preferences, 10), expected), preferences
+        candidates = index.candidates(preferences)
+        if candidates is not None:
+            assert len(candidates) == len(mask_and_sort(movies, preferences, len(movies))), preferences
+
+
+def test_top_n_matches_mask_and_sort():
+    movies = catalog(400, seed=7)
+    assert movies['Lead Studio'].isna().any()
+    assert_matches_mask_and_sort(FilterIndex(movies), movies)
+
+
+def test_updated_index_matches_mask_and_sort():
+    movies = catalog(400, seed=8)
+    index = FilterIndex(movies.iloc[:300])
+    index.add_rows(movies, 300)
+    assert_matches_mask_and_sort(index, movies)
+
+    keep = np.random.default_rng(8).random(len(movies)) > 0.25
+    new_ids = np.cumsum(keep) - 1
+    new_ids[~keep] = -1
+    index.remove_rows(keep, new_ids)
+    movies = movies[keep].reset_index(drop=True)
+    assert_matches_mask_and_sort(index, movies)
+
+    # A changed scaler range moves every score
+    for column in ['Audience score %', 'Rotten Tomatoes %']:
+        movies[column] = (movies[column] * 0.8 + 0.1).astype(np.float32)
+    index.refresh_scores(movies)
+    assert_matches_mask_and_sort(index, movies)
+
+
+def test_no_filters_returns_none():
+    index = FilterIndex(catalog(50, seed=9))
+    assert index.candidates({'Genre': None, 'Studio': None, 'Min Audience Score': 0, 'Min Critic Score': 0}) is None
+    assert len(index.top_n({}, 5)) == 5
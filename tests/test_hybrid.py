@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pytest
+
+from engine import RecommendationEngine
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'movies.csv')
+
+PREFERENCES = [
+    {},
+    {'Genre': 'Animation'},
+    {'Studio': 'Disney', 'Min Audience Score': 60},
+    {'Genre': 'Comedy', 'Min Audience Score': 50, 'Min Critic Score': 40},
+]
+
+
+@pytest.fixture(scope='module')
+def engine():
+    return RecommendationEngine(MOVIES_CSV, n_neighbors=20)
+
+
+def passes(movies, preferences):
+    """Which rows of movies pass the filters, checked directly on the frame"""
+    mask = np.ones(len(movies), dtype=bool)
+    if preferences.get('Genre'):
+        mask &= (movies['Genre'] == preferences['Genre']).to_numpy()
+    if preferences.get('Studio'):
+        mask &= (movies['Lead Studio'] == preferences['Studio']).to_numpy()
+    mask &= (movies['Audience score %'] >= preferences.get('Min Audience Score', 0)/100).to_numpy()
+    mask &= (movies['Rotten Tomatoes %'] >= preferences.get('Min Critic Score', 0)/100).to_numpy()
+    return mask
+
+
+def test_seed_and_duplicate_titles_are_never_returned(engine):
+    assert engine.movies['Film'].duplicated().any()
+    n_titles = engine.movies['Film'].nunique()
+    for title in engine.title_index.titles:
+        films = engine.recommend_hybrid(title, {}, 100)['Film']
+        assert title not in set(films)
+        assert films.is_unique
+        assert len(films) == n_titles - 1
+
+
+@pytest.mark.parametrize('preferences', PREFERENCES)
+def test_every_result_passes_the_filters(engine, preferences):
+    allowed = passes(engine.movies, preferences)
+    for title in engine.title_index.titles[:10]:
+        recommendations = engine.recommend_hybrid(title, preferences, 100)
+        assert allowed[recommendations.index].all()
+        expected = engine.movies[allowed & ~engine.movies['Film'].duplicated().to_numpy()]
+        assert len(recommendations) == len(expected[expected['Film'] != title])
+
+
+@pytest.mark.parametrize('preferences', PREFERENCES)
+def test_feature_only_weights_rank_like_recommend_features(engine, preferences):
+    first = ~engine.movies['Film'].duplicated().to_numpy()
+    for title in ['WALL-E', 'Tangled', 'Gnomeo and Juliet']:
+        features = engine.recommend_features(preferences, len(engine.movies))
+        features = features[first[features.index] & (features['Film'] != title)]
+        hybrid = engine.recommend_hybrid(title, preferences, 10, weights=(0, 1))
+        assert list(hybrid.index) == list(features.index[:10])
+
+
+def test_content_only_weights_rank_by_similarity_to_the_seed(engine):
+    first = ~engine.movies['Film'].duplicated().to_numpy()
+    for title in ['WALL-E', 'Tangled', 'Gnomeo and Juliet']:
+        seed = engine.title_index.row(title)
+        similarity = (engine.tfidf_matrix @ engine.tfidf_matrix[seed].T).toarray().ravel()
+        rows = np.flatnonzero(first & (np.arange(len(first)) != seed))
+        expected = rows[np.lexsort((rows, -similarity[rows]))][:10]
+        hybrid = engine.recommend_hybrid(title, {}, 10, weights=(1, 0))
+        assert list(hybrid.index) == list(expected)
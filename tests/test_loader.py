@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+
+from loader import CATEGORICAL_COLUMNS, concat_catalogs, clean_catalog, load_catalog
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'movies.csv')
+
+
+def test_chunked_load_matches_single_chunk_with_missing_studios(tmp_path):
+    raw = pd.read_csv(MOVIES_CSV, dtype=str)
+    raw.loc[4:7, 'Lead Studio'] = None
+    path = tmp_path / 'movies.csv'
+    raw.to_csv(path, index=False)
+
+    chunked = load_catalog(path, chunksize=4)
+    whole = load_catalog(path, chunksize=len(raw))
+
+    assert chunked.dtypes.equals(whole.dtypes)
+    for column in CATEGORICAL_COLUMNS:
+        assert chunked[column].cat.categories.dtype == whole[column].cat.categories.dtype
+        assert chunked[column].astype(object).equals(whole[column].astype(object))
+    pd.testing.assert_frame_equal(chunked.drop(columns=CATEGORICAL_COLUMNS),
+                                  whole.drop(columns=CATEGORICAL_COLUMNS))
+
+
+def test_concat_accepts_a_frame_without_any_studio():
+    movies = load_catalog(MOVIES_CSV)
+    new = clean_catalog(pd.DataFrame([{'Film': 'New Film', 'Genre': 'Drama', 'Lead Studio': None,
+                                       'Audience score %': 50, 'Profitability': 1.0,
+                                       'Rotten Tomatoes %': 40, 'Worldwide Gross': '$1.00', 'Year': 2020}]))
+
+    combined = concat_catalogs([movies, new])
+    assert len(combined) == len(movies) + 1
+    assert isinstance(combined['Lead Studio'].dtype, pd.CategoricalDtype)
+    assert pd.isna(combined['Lead Studio'].iloc[-1])
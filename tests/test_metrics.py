@@ -0,0 +1,33 @@
+import threading
+import time
+
+from metrics import Metrics
+
+
+def test_concurrent_profiled_calls_do_not_fail(tmp_path):
+    metrics = Metrics()
+    metrics.profile_dir = str(tmp_path)
+
+    @metrics.timed('query', profile=True)
+    def query():
+        time.sleep(0.02)
+        return 1
+
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(query())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert results == [1] * 4
+    assert metrics.snapshot()['timers']['query']['count'] == 4
+    assert list(tmp_path.glob('profile-query-*.prof'))
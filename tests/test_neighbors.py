@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+from neighbors import NeighborIndex
+
+
+def random_matrix(n_rows, seed):
+    """L2-normalised sparse rows, as produced by the TF-IDF vectorizer"""
+    matrix = sp.random(n_rows, 60, density=0.08, random_state=seed, format='csr', dtype=np.float64)
+    # Every row gets one term so no row is all zeros
+    matrix = matrix + sp.csr_matrix((np.ones(n_rows), (np.arange(n_rows), np.arange(n_rows) % 60)),
+                                    shape=matrix.shape)
+    return normalize(matrix)
+
+
+def assert_same_neighbors(index, expected):
+    """Equal lists except for the order of neighbours with tied scores"""
+    assert index.indices.shape == expected.indices.shape
+    np.testing.assert_allclose(index.scores, expected.scores, rtol=1e-5, atol=1e-6)
+    # Only a tie with the last neighbour can swap which rows make the list
+    above_last = expected.scores > expected.scores[:, -1:] + 1e-5
+    for row in range(len(expected)):
+        assert set(index.indices[row][above_last[row]]) == set(expected.indices[row][above_last[row]])
+
+
+def test_add_rows_matches_build():
+    matrix = random_matrix(300, seed=1)
+    index = NeighborIndex.build(matrix[:240], k=10, block_elements=2000)
+    index.add_rows(matrix[:270], k=10, block_elements=2000)
+    index.add_rows(matrix, k=10, block_elements=2000)
+    assert_same_neighbors(index, NeighborIndex.build(matrix, k=10))
+
+
+def test_remove_rows_matches_build():
+    matrix = random_matrix(300, seed=2)
+    keep = np.random.default_rng(2).random(300) > 0.2
+    index = NeighborIndex.build(matrix, k=10)
+    index.remove_rows(matrix[np.flatnonzero(keep)], keep, k=10, block_elements=2000)
+    assert_same_neighbors(index, NeighborIndex.build(matrix[np.flatnonzero(keep)], k=10))
+
+
+@pytest.mark.parametrize('n_rows', [1, 5, 301])
+def test_parallel_build_is_identical(n_rows):
+    matrix = random_matrix(n_rows, seed=3)
+    serial = NeighborIndex.build(matrix, k=10, block_elements=3000)
+    parallel = NeighborIndex.build(matrix, k=10, block_elements=3000, n_jobs=2)
+    assert np.array_equal(parallel.indices, serial.indices)
+    assert np.array_equal(parallel.scores, serial.scores)
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from engine import RecommendationEngine
+from server import RecommendationServer
+
+MOVIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'movies.csv')
+
+
+@pytest.fixture(scope='module')
+def server():
+    """A server on a free localhost port, running its event loop in a background thread"""
+    engine = RecommendationEngine(MOVIES_CSV, n_neighbors=20)
+    # A wide window so concurrent test requests reliably share batches
+    server = RecommendationServer(engine, port=0, batch_window=0.05)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def get(server, path):
+    """Status and decoded body of a GET request"""
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}{path}', timeout=30) as response:
+            status, body, content_type = response.status, response.read(), response.headers['Content-Type']
+    except urllib.error.HTTPError as e:
+        status, body, content_type = e.code, e.read(), e.headers['Content-Type']
+    return status, json.loads(body) if content_type == 'application/json' else body.decode()
+
+
+def test_endpoints(server):
+    assert get(server, '/health') == (200, {'status': 'ok', 'movies': len(server.engine.movies)})
+
+    status, body = get(server, '/recommend/content?title=WALL-E&n=5')
+    assert status == 200 and body['title'] == 'WALL-E'
+    assert len(body['recommendations']) == 5
+    assert 'WALL-E' not in [movie['Film'] for movie in body['recommendations']]
+    status, body = get(server, '/recommend/content?title=WALL-E&n=15')
+    films = [movie['Film'] for movie in body['recommendations']]
+    assert len(films) == 15 and len(set(films)) == 15
+
+    status, body = get(server, '/recommend/feature?genre=Comedy&min_audience=50&n=3')
+    assert status == 200 and len(body['recommendations']) == 3
+    assert all(movie['Genre'] == 'Comedy' for movie in body['recommendations'])
+
+    status, body = get(server, '/recommend/hybrid?title=wall-e&genre=Animation&n=3')
+    assert status == 200
+    assert all(movie['Genre'] == 'Animation' for movie in body['recommendations'])
+
+    for path in ['/recommend/session/content?title=WALL-E&title=Tangled&weight=2&weight=1&n=4',
+                 '/recommend/session/hybrid?title=WALL-E&title=Tangled&min_critic=20&n=4']:
+        status, body = get(server, path)
+        assert status == 200 and body['titles'] == ['WALL-E', 'Tangled']
+        assert not {'WALL-E', 'Tangled'} & {movie['Film'] for movie in body['recommendations']}
+
+    assert get(server, '/titles?q=wal&n=3')[1]['titles'][0] == 'WALL-E'
+    assert set(get(server, '/stats')[1]) == {'result_cache', 'content_batches', 'hybrid_batches'}
+    status, text = get(server, '/metrics')
+    assert status == 200 and 'moviemagic_stage_seconds' in text
+    assert 'timers' in get(server, '/metrics?format=json')[1]
+
+
+@pytest.mark.parametrize('path', [
+    '/recommend/content?title=WALL-E&n=0',
+    '/recommend/content?title=WALL-E&n=many',
+    '/recommend/content?n=5',
+    '/recommend/feature?min_audience=nan',
+    '/recommend/hybrid?title=WALL-E&min_critic=inf',
+    '/recommend/feature?min_audience=1e400',
+    '/recommend/session/content?title=WALL-E&title=Tangled&weight=1',
+    '/recommend/session/content?title=WALL-E&weight=-1',
+])
+def test_bad_requests(server, path):
+    status, body = get(server, path)
+    assert status == 400
+    assert body['error']
+
+
+def test_unknown_titles_get_suggestions(server):
+    status, body = get(server, '/recommend/content?title=WALLE')
+    assert status == 404
+    assert 'WALL-E' in body['suggestions']
+
+    status, body = get(server, '/recommend/session/content?title=WALL-E&title=Tangeld')
+    assert status == 404
+    assert 'Tangled' in body['suggestions']['Tangeld']
+
+    assert get(server, '/no/such/path')[0] == 404
+
+
+def test_concurrent_requests_are_batched(server):
+    before = get(server, '/stats')[1]
+    titles = list(server.engine.title_index.titles[:40])
+    paths = ([f'/recommend/content?title={urllib.request.quote(title)}&n=5' for title in titles] +
+             [f'/recommend/hybrid?title={urllib.request.quote(title)}&min_audience=40&n=5' for title in titles])
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        statuses = [status for status, _ in pool.map(lambda path: get(server, path), paths)]
+    assert statuses == [200] * len(paths)
+
+    after = get(server, '/stats')[1]
+    for name in ['content_batches', 'hybrid_batches']:
+        requests = after[name]['requests'] - before[name]['requests']
+        batches = after[name]['batches'] - before[name]['batches']
+        assert requests == len(titles)
+        assert batches < requests
@@ -0,0 +1,71 @@
+import numpy as np
+
+from title_index import TitleIndex, normalize_title
+
+TITLES = ['WALL-E', 'Wall Street', 'Waitress', 'Up', 'Tangled', 'The Proposal', 'Twilight', 'Walk the Line']
+
+
+def make_index():
+    return TitleIndex(TITLES, np.arange(len(TITLES)) * 10)
+
+
+def test_exact_lookup_ignores_case_and_whitespace():
+    index = make_index()
+    assert index.row('WALL-E') == 0
+    assert index.row('wall-e') == 0
+    assert index.row('  The   proposal ') == 50
+    assert index.row('Wall') is None
+    assert normalize_title(' The\tProposal ') == 'the proposal'
+
+
+def test_prefix_matches_are_alphabetical():
+    index = make_index()
+    assert index.prefix('wal') == ['Walk the Line', 'Wall Street', 'WALL-E']
+    assert index.prefix('WALL') == ['Wall Street', 'WALL-E']
+    assert index.prefix('wa', limit=2) == ['Waitress', 'Walk the Line']
+    assert index.prefix('zz') == []
+
+
+def test_fuzzy_ranks_a_misspelled_title_first():
+    index = make_index()
+    matches = index.fuzzy('WALLE')
+    assert matches[0][0] == 'WALL-E'
+    assert [similarity for _, similarity in matches] == sorted((s for _, s in matches), reverse=True)
+    assert index.fuzzy('Tangeld')[0][0] == 'Tangled'
+    assert index.search('walle')[0] == 'WALL-E'
+
+
+def test_search_puts_the_exact_match_first():
+    index = make_index()
+    assert index.search('up')[0] == 'Up'
+    assert index.search('wal', limit=3) == ['Walk the Line', 'Wall Street', 'WALL-E']
+    assert index.search('') == sorted(TITLES, key=normalize_title)
+
+
+def test_removed_title_is_no_longer_suggested():
+    index = make_index()
+    index.warm()
+    keep = np.ones(len(TITLES) * 10, dtype=bool)
+    keep[0] = False
+    new_ids = np.cumsum(keep) - 1
+    new_ids[~keep] = -1
+    index.remove(['WALL-E'], new_ids)
+
+    assert index.row('wall-e') is None
+    assert 'WALL-E' not in index.search('walle')
+    assert 'WALL-E' not in index.prefix('wal')
+    assert 'WALL-E' not in [title for title, _ in index.fuzzy('WALL-E')]
+    assert 'WALL-E' not in index.titles
+    assert len(index) == len(TITLES) - 1
+    assert index.row('Wall Street') == 9
+
+
+def test_added_titles_are_found():
+    index = make_index()
+    index.warm()
+    added = index.add(['Up', 'Wall-E 2', 'Zootopia'], [80, 81, 82])
+    assert list(added) == [False, True, True]
+    assert index.row('up') == 30
+    assert index.row('zootopia') == 82
+    assert index.prefix('wall') == ['Wall Street', 'WALL-E', 'Wall-E 2']
+    assert index.fuzzy('Zootopa')[0][0] == 'Zootopia'
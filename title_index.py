@@ -0,0 +1,234 @@
+import bisect
+import re
+import threading
+
+import numpy as np
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_title(title):
+    """Case- and whitespace-insensitive form of a title used for searching"""
+    return _WHITESPACE.sub(' ', str(title)).strip().casefold()
+
+
+def trigrams(key):
+    """Set of character trigrams of a normalized title, padded at word boundaries"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Exact, prefix and trigram fuzzy lookup over movie titles
+
+    Each distinct title is indexed once, pointing at its first row. Exact
+    lookups are dictionary hits; prefix search walks a sorted key list; the
+    trigram postings for fuzzy search are built on the first fuzzy query.
+    Titles can be added and removed in place; removed titles leave a
+    tombstone (row -1) until they make up half the index, which is then
+    rebuilt.
+    """
+
+    def __init__(self, titles, rows):
+        self._titles = list(titles)
+        self._rows = np.asarray(rows, dtype=np.int64)
+        self.keys = [normalize_title(title) for title in self._titles]
+        self._removed = 0
+
+        self._exact = dict(zip(self._titles, range(len(self._titles))))
+        self._normalized = {}
+        for position, key in enumerate(self.keys):
+            self._normalized.setdefault(key, position)
+
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self._sorted_keys = [self.keys[position] for position in order]
+        self._sorted_positions = order
+
+        self._postings = None
+        self._trigram_counts = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._titles) - self._removed
+
+    @property
+    def titles(self):
+        """Indexed titles, each the first occurrence of its title"""
+        if not self._removed:
+            return self._titles
+        return [title for title, row in zip(self._titles, self._rows) if row >= 0]
+
+    @property
+    def rows(self):
+        """Row id of each title in titles"""
+        if not self._removed:
+            return self._rows
+        return self._rows[self._rows >= 0]
+
+    def row(self, title):
+        """Row id of a title, ignoring case and extra spaces; None if unknown"""
+        position = self._position(title)
+        return None if position is None else int(self._rows[position])
+
+    def add(self, titles, rows):
+        """Index titles found at rows; titles already in the index are skipped
+
+        Returns a boolean mask over titles of the ones that were added.
+        """
+        added = np.zeros(len(titles), dtype=bool)
+        resort = len(titles) > len(self._sorted_keys) // 16
+        positions = []
+        for i, title in enumerate(titles):
+            if title in self._exact:
+                continue
+            position = len(self._titles)
+            key = normalize_title(title)
+            self._titles.append(title)
+            self.keys.append(key)
+            self._exact[title] = position
+            self._normalized.setdefault(key, position)
+            if not resort:
+                index = bisect.bisect_right(self._sorted_keys, key)
+                self._sorted_keys.insert(index, key)
+                self._sorted_positions.insert(index, position)
+            positions.append(position)
+            added[i] = True
+
+        self._rows = np.concatenate([self._rows, np.asarray(rows, dtype=np.int64)[added]])
+        if resort and positions:
+            # Inserting one by one costs more than sorting once for large batches
+            self._sorted_positions = sorted(self._sorted_positions + positions, key=self.keys.__getitem__)
+            self._sorted_keys = [self.keys[position] for position in self._sorted_positions]
+        with self._lock:
+            if self._postings is not None:
+                self._add_trigrams(positions)
+        return added
+
+    def remove(self, titles, new_ids):
+        """Drop titles from the index and renumber the remaining rows
+
+        new_ids maps each old row id to its new one, or to -1 for removed rows.
+        """
+        for title in titles:
+            position = self._exact.pop(title, None)
+            if position is None:
+                continue
+            key = self.keys[position]
+            start = bisect.bisect_left(self._sorted_keys, key)
+            end = bisect.bisect_right(self._sorted_keys, key, lo=start)
+            index = start + self._sorted_positions[start:end].index(position)
+            del self._sorted_keys[index]
+            del self._sorted_positions[index]
+            if self._normalized.get(key) == position:
+                # Another spelling with the same key takes over, lowest position first
+                if end - 1 > start:
+                    self._normalized[key] = self._sorted_positions[start]
+                else:
+                    del self._normalized[key]
+            self._rows[position] = -1
+            self._removed += 1
+
+        live = self._rows >= 0
+        self._rows[live] = new_ids[self._rows[live]]
+        if self._removed > len(self._titles) // 2:
+            self.__init__(self.titles, self.rows)
+
+    def _position(self, title):
+        position = self._exact.get(title)
+        if position is None:
+            position = self._normalized.get(normalize_title(title))
+        return position
+
+    def prefix(self, text, limit=10):
+        """Titles starting with text, in alphabetical order"""
+        key = normalize_title(text)
+        start = bisect.bisect_left(self._sorted_keys, key)
+        matches = []
+        for i in range(start, min(start + limit, len(self._sorted_keys))):
+            if not self._sorted_keys[i].startswith(key):
+                break
+            matches.append(self._titles[self._sorted_positions[i]])
+        return matches
+
+    def fuzzy(self, text, limit=10, min_similarity=0.2):
+        """Titles ranked by trigram (Jaccard) similarity to text, as (title, similarity) pairs"""
+        query = trigrams(normalize_title(text))
+        postings, trigram_counts = self._fuzzy_index()
+        hits = [postings[gram] for gram in query if gram in postings]
+        if not hits or limit <= 0:
+            return []
+
+        # Count shared trigrams per title; Jaccard similarity is at most shared/len(query),
+        # so titles sharing too few trigrams can be skipped before scoring
+        shared = np.bincount(np.concatenate(hits), minlength=len(self.keys))
+        candidates = np.flatnonzero(shared >= max(1, np.ceil(min_similarity * len(query))))
+        if self._removed:
+            candidates = candidates[self._rows[candidates] >= 0]
+        shared = shared[candidates]
+        similarity = shared / (len(query) + trigram_counts[candidates] - shared)
+        keep = similarity >= min_similarity
+        candidates, similarity = candidates[keep], similarity[keep]
+        if candidates.size > limit:
+            best = np.argpartition(-similarity, limit - 1)[:limit]
+            candidates, similarity = candidates[best], similarity[best]
+        order = np.lexsort((candidates, -similarity))
+        return [(self._titles[candidates[i]], float(similarity[i])) for i in order]
+
+    def search(self, text, limit=10):
+        """Typeahead suggestions: exact match, then prefix matches, then fuzzy matches"""
+        if not normalize_title(text):
+            return [self._titles[position] for position in self._sorted_positions[:limit]]
+
+        suggestions = []
+        exact = self._position(text)
+        if exact is not None:
+            suggestions.append(self._titles[exact])
+        for title in self.prefix(text, limit):
+            if title not in suggestions:
+                suggestions.append(title)
+        if len(suggestions) < limit:
+            for title, _ in self.fuzzy(text, limit):
+                if title not in suggestions:
+                    suggestions.append(title)
+        return suggestions[:limit]
+
+    def warm(self):
+        """Build the fuzzy-search postings now instead of on the first fuzzy query"""
+        self._fuzzy_index()
+
+    def _add_trigrams(self, positions):
+        """Extend built postings and counts with new positions; the caller holds the lock
+
+        The extended postings replace the old ones as a whole, so a fuzzy query
+        running concurrently keeps a consistent pair of postings and counts.
+        """
+        postings = {}
+        counts = np.empty(len(positions), dtype=np.int32)
+        for i, position in enumerate(positions):
+            grams = trigrams(self.keys[position])
+            counts[i] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        extended = dict(self._postings)
+        for gram, new in postings.items():
+            new = np.array(new, dtype=np.int32)
+            existing = extended.get(gram)
+            extended[gram] = new if existing is None else np.concatenate([existing, new])
+        self._postings = extended
+        self._trigram_counts = np.concatenate([self._trigram_counts, counts])
+
+    def _fuzzy_index(self):
+        """Trigram postings (trigram -> positions) and per-title trigram counts"""
+        with self._lock:
+            if self._postings is None:
+                postings = {}
+                counts = np.empty(len(self.keys), dtype=np.int32)
+                for position, key in enumerate(self.keys):
+                    grams = trigrams(key)
+                    counts[position] = len(grams)
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(position)
+                self._postings = {gram: np.array(positions, dtype=np.int32)
+                                  for gram, positions in postings.items()}
+                self._trigram_counts = counts
+            return self._postings, self._trigram_counts
@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundRunner:
+    """Run work on a thread pool and deliver results on the Tk main thread
+
+    Finished futures are picked up by polling with root.after, so callbacks
+    may touch widgets. Tasks submitted on the same channel supersede each
+    other: a newer task cancels the older one if it has not started yet,
+    and the older one's result is discarded if it has.
+    """
+
+    def __init__(self, root, max_workers=2, poll_ms=50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='moviemagic')
+        self._pending = []
+        self._latest = {}
+        self._poll_id = None
+
+    def submit(self, fn, *args, on_done=None, on_error=None, channel=None):
+        """Run fn(*args) in the background; on_done/on_error are called on the main thread"""
+        if channel is not None:
+            previous = self._latest.get(channel)
+            if previous is not None:
+                previous.cancel()
+        future = self._executor.submit(fn, *args)
+        if channel is not None:
+            self._latest[channel] = future
+        self._pending.append((future, channel, on_done, on_error))
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+        return future
+
+    def is_busy(self, channel):
+        """Whether the latest task on a channel is still running"""
+        future = self._latest.get(channel)
+        return future is not None and not future.done()
+
+    def _poll(self):
+        self._poll_id = None
+        pending, self._pending = self._pending, []
+        for task in pending:
+            future, channel, on_done, on_error = task
+            if not future.done():
+                self._pending.append(task)
+                continue
+            if future.cancelled() or (channel is not None and self._latest.get(channel) is not future):
+                continue
+            if channel is not None:
+                del self._latest[channel]
+
+            # Callbacks run on the main thread and may submit more work
+            error = future.exception()
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+            elif on_done is not None:
+                on_done(future.result())
+
+        if self._pending and self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        """Stop accepting work and drop anything that has not started"""
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._executor.shutdown(wait=False, cancel_futures=True)